@@ -1,125 +1,86 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
-import random
-from src.Direction import Direction
+from src.RandomStream import RandomStream
 from src.Route import Route
 
 # Class that represents the ants functionality.
+# The ant walks over the cell ids of the maze. Its path is the ordered list of the cells from the start to its
+# current position, the tiles it has visited are marked with the visit stamp of its walk on the maze, so checking
+# whether a tile was visited takes constant time and nothing has to be cleared for the next ant.
 class Ant:
 
     # Constructor for ant taking a Maze and PathSpecification.
     # @param maze Maze the ant will be running in.
     # @param spec The path specification consisting of a start coordinate and an end coordinate.
-    def __init__(self, maze, path_specification):
+    # @param rng RandomStream the ant draws its choices from, the default stream if not given.
+    def __init__(self, maze, path_specification, rng=None):
         self.maze = maze
+        self.rng = rng if rng is not None else RandomStream.get_default()
         self.start = path_specification.get_start()
         self.end = path_specification.get_end()
-        self.current_position = self.start
         self.maximum_loops = 100000000
-        self.visited = list()
+        self.path = list()
 
     # Method that performs a single run through the maze by the ant.
+    # At every step the ant picks a neighbour it has not visited yet, with a probability proportional to its
+    # pheromone. When there is none it goes back along its path.
     # @return The route the ant found through the maze.
     def find_route(self):
-        # list to add the visited coordinates to
+        maze = self.maze
+        start = maze.get_cell(self.start)
+        end = maze.get_cell(self.end)
+        if start < 0 or end < 0:
+            print("Ant is not at the goal")
+            return Route(self.start)
+        rng = self.rng
+        marks, stamp = maze.new_visit_stamp()
+        marks[start] = stamp
+        self.path = [start]
+        current = start
         iterate = 0
-        # while the ant didn't reach our destination, repeat
-        while iterate < self.maximum_loops and not self.current_position == self.end:
-            surrounding_pheromone = self.get_pheromone()
+        while iterate < self.maximum_loops and current != end:
+            iterate += 1
+            neighbours = maze.get_neighbours(current)
+            pheromones = maze.get_neighbour_pheromones(current)
+            total = 0.0
+            for d in range(4):
+                if neighbours[d] >= 0 and marks[neighbours[d]] == stamp:
+                    pheromones[d] = 0.0
+                total += pheromones[d]
+            if total == 0:
+                current = self.step_back()
+                if current < 0:
+                    break
+                continue
 
             # get a random value from the range representing all surrounding pheromones
             # range (0, pheromone in direction 0) represents going to direction 0
             # range (pheromone in direction 0, pheromone in direction 1) represents going to direction 1
             # etc.
-            random_value = random.uniform(0, surrounding_pheromone.get_total_surrounding_pheromone())
-            east = surrounding_pheromone.get(Direction(0))
-            north = surrounding_pheromone.get(Direction(1))
-            west = surrounding_pheromone.get(Direction(2))
-            if random_value < east:
-                direction = Direction(0)
-            elif random_value < east+north:
-                direction = Direction(1)
-            elif random_value < east+north+west or surrounding_pheromone.get(Direction(3)) == 0:
-                direction = Direction(2)
-            else:
-                direction = Direction(3)
-
-            # add chosen direction to route, change current position in given direction
-            self.visited.append(self.current_position)
-            self.current_position = self.current_position.add_direction(direction)
-            #print("ant position x:", str(self.current_position.get_x()), "y:", str(self.current_position.get_y()))
-            iterate += 1
-        if self.current_position == self.end:
-            self.visited.append(self.current_position)
-            route = self.create_route()
-        else:
-            print("Ant is not at the goal")
-            route = Route(self.start)
-        return route
-
-    def get_pheromone(self):
-
-        if len(self.visited) >= 1:
-
-            # -1 means last element,
-            # so we check whether the direction is going to the same direction as the ant came from.
-            prev_pos = self.visited[-1]
-            direction_back = self.current_position.coordinate_to_dir(prev_pos)
-            get_visited = self.get_visited()
-            # retrieve pheromone from the maze
-            surrounding_pheromone = self.maze \
-                .get_surrounding_pheromone_exclude(self.current_position, get_visited)
-
-            # if dead end, go back
-            if surrounding_pheromone.get_total_surrounding_pheromone() == 0:
-                #print("dead end encountered")
-                surrounding_pheromone = self.close_dead_end(surrounding_pheromone)
-        else:
-            # print("now: ",str(self.current_position.get_x()), str(self.current_position.get_y()))
-            surrounding_pheromone = self.maze \
-                .get_surrounding_pheromone(self.current_position)
-        return surrounding_pheromone
-
-    def get_visited(self):
-        dirs = [Direction.east, Direction.north, Direction.west, Direction.south]
-        dir_array = list()
-        for i in dirs:
-            check_pos = self.current_position.add_direction(i)
-            if check_pos in self.visited:
-                dir_array.append(i)
-        return dir_array
-
-    def create_route(self):
-        route = Route(self.start)
-        position = self.start
-        # print("now: ",str(self.start.get_x()), str(self.start.get_y()))
-        for i in range(1, len(self.visited)):
-            # print("now: ",str(position.get_x()), str(position.get_y()))
-            route.add(position.coordinate_to_dir(self.visited[i]))
-            position = self.visited[i]
-
-        return route
+            random_value = rng.random() * total
+            direction = 0
+            for d in range(4):
+                if pheromones[d] > 0:
+                    direction = d
+                    random_value -= pheromones[d]
+                    if random_value < 0:
+                        break
+            current = neighbours[direction]
+            marks[current] = stamp
+            self.path.append(current)
 
-    def close_dead_end(self, surrounding_pheromone):
-        #print("close dead end innitated: ", str(self.current_position.get_x()), str(self.current_position.get_y()))
-        self.visited.append(self.current_position)
-        # print(str(surrounding_pheromone.get_number_of_walls()))
-        while surrounding_pheromone.get_number_of_walls() == 4:
-            # print(str(surrounding_pheromone.get_number_of_walls()))
-            self.one_step_back()
-            surrounding_pheromone = self.maze.get_surrounding_pheromone(self.current_position)
-        self.visited.pop()
-        surrounding_pheromone = self.get_pheromone()
-        return surrounding_pheromone
+        if current == end:
+            return maze.create_route(self.path)
+        print("Ant is not at the goal")
+        return Route(self.start)
 
-    def one_step_back(self):
-        #print("step back: current pos:  (", str(self.current_position.get_x()), str(self.current_position.get_y()))
-        if len(self.visited) >=2:
-            #print("), prev pos", str(self.visited[-2].get_x()), str(self.visited[-2].get_y()))
-            self.current_position = self.visited[-2]
-            self.maze.set_zero(self.visited[-1])
-            self.visited.pop()
-        else:
-            self.visited = list()
-            self.current_position = self.start
+    # Go back one tile from a dead end.
+    # The tile left behind is closed for all ants by setting its pheromone to zero, and stays marked as visited,
+    # so the ant does not walk into it again.
+    # @return the cell id the ant is on after going back, -1 if it is back at the start with nowhere to go
+    def step_back(self):
+        if len(self.path) < 2:
+            return -1
+        self.maze.set_cell_zero(self.path.pop())
+        return self.path[-1]
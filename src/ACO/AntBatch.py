@@ -0,0 +1,142 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+from src.RandomStream import RandomStream
+from src.Route import Route
+
+# Class that runs a whole generation of ants through the maze in lockstep.
+# Instead of walking one Ant at a time, the positions, visited sets and states of all ants are held in arrays
+# and every step advances all ants that are still walking at once. The ants behave like Ant: they choose
+# a neighbour with probability proportional to its pheromone, never step back onto a tile they have visited,
+# and walk back out of dead ends, zeroing the pheromone of the dead end tiles in the maze.
+class AntBatch:
+
+    # Constructor for a batch of ants taking a Maze and PathSpecification.
+    # @param maze Maze the ants will be running in.
+    # @param path_specification The path specification consisting of a start coordinate and an end coordinate.
+    # @param ant_count Number of ants walking together.
+    # @param rng RandomStream the ants draw their choices from, the default stream if not given.
+    def __init__(self, maze, path_specification, ant_count, rng=None):
+        self.maze = maze
+        self.rng = rng if rng is not None else RandomStream.get_default()
+        self.start = path_specification.get_start()
+        self.end = path_specification.get_end()
+        self.ant_count = ant_count
+        self.maximum_loops = 100000000
+
+    # Method that performs a single run through the maze for every ant of the batch.
+    # @return A list with the route of every ant, an empty route for ants that did not reach the end.
+    def find_routes(self):
+        routes = []
+        for ant_routes in self.find_target_routes([self.end]):
+            if ant_routes[0] is None:
+                print("Ant is not at the goal")
+                routes.append(Route(self.start))
+            else:
+                routes.append(ant_routes[0])
+        return routes
+
+    # Let every ant of the batch walk from the start until it has visited all the targets.
+    # The route to a target is the path of the ant at the moment it first steps on the target. Ants walk back out
+    # of dead ends as usual, but a target tile is never closed, so the other ants can still reach it.
+    # @param targets List of coordinates to visit
+    # @return A list per ant with the route to every target, None for targets the ant did not reach.
+    def find_target_routes(self, targets):
+        maze = self.maze
+        n = self.ant_count
+        start = maze.get_cell(self.start)
+        routes = [[None] * len(targets) for ant in range(n)]
+        target_cells = [maze.get_cell(target) for target in targets]
+        if start < 0:
+            print("Start of the batch is not accessible")
+            return routes
+
+        # index of every distinct target tile, target_index holds it per tile and is -1 for the other tiles
+        distinct = {}
+        for cell in target_cells:
+            if cell >= 0 and cell != start and cell not in distinct:
+                distinct[cell] = len(distinct)
+        if len(distinct) == 0:
+            return self.collect_routes(routes, target_cells, distinct, {})
+        target_index = np.full(maze.cell_count, -1, dtype=np.intp)
+        target_index[list(distinct)] = list(distinct.values())
+
+        neighbours = maze.neighbours
+        cell_flat = maze.cell_flat
+        pheromones = maze.flat_pheromones
+        closable = target_index < 0
+
+        # every ant keeps its path as a stack of cell ids, a tile is never on the stack twice
+        stack = np.empty((n, maze.cell_count + 1), dtype=np.int32)
+        stack[:, 0] = start
+        depth = np.ones(n, dtype=np.intp)
+        visited = np.zeros((n, maze.cell_count), dtype=bool)
+        visited[:, start] = True
+        found = np.zeros((n, len(distinct)), dtype=bool)
+        walking = np.ones(n, dtype=bool)
+        paths = {}
+
+        iterate = 0
+        while iterate < self.maximum_loops and walking.any():
+            ants = np.flatnonzero(walking)
+            current = stack[ants, depth[ants] - 1]
+            around = neighbours[current]
+            accessible = around >= 0
+            safe = np.where(accessible, around, 0)
+            weights = np.where(accessible, pheromones[cell_flat[safe]], 0.0)
+            weights[visited[ants[:, None], safe]] = 0.0
+            cumulative = np.cumsum(weights, axis=1)
+            total = cumulative[:, 3]
+
+            # ants without a way forward take one step back and close the tile behind them
+            stuck = total <= 0
+            if stuck.any():
+                stuck_ants = ants[stuck]
+                at_start = depth[stuck_ants] == 1
+                walking[stuck_ants[at_start]] = False
+                back = stuck_ants[~at_start]
+                dead_ends = current[stuck][~at_start]
+                dead_ends = dead_ends[closable[dead_ends]]
+                pheromones[cell_flat[dead_ends]] = 0
+                depth[back] -= 1
+
+            # roulette wheel selection for all other ants with one draw
+            moving = ~stuck
+            movers = ants[moving]
+            if len(movers) > 0:
+                random_values = self.rng.random_block(len(movers)) * total[moving]
+                choice = np.minimum((cumulative[moving] <= random_values[:, None]).sum(axis=1), 3)
+                chosen = around[moving, choice]
+                stack[movers, depth[movers]] = chosen
+                depth[movers] += 1
+                visited[movers, chosen] = True
+                hit = target_index[chosen]
+                arrived = hit >= 0
+                for ant, index in zip(movers[arrived].tolist(), hit[arrived].tolist()):
+                    if not found[ant, index]:
+                        found[ant, index] = True
+                        paths[ant, index] = stack[ant, :depth[ant]].copy()
+                        if found[ant].all():
+                            walking[ant] = False
+            iterate += 1
+
+        found_routes = {}
+        for key, path in paths.items():
+            found_routes[key] = maze.create_route(path)
+        return self.collect_routes(routes, target_cells, distinct, found_routes)
+
+    # Fill the routes per ant and target from the routes found per ant and distinct target tile.
+    # @param routes List per ant of the route to every target, filled in place
+    # @param target_cells Cell id of every target
+    # @param distinct Dictionary from target cell id to distinct target index, without the start
+    # @param found Dictionary from (ant, distinct target index) to route
+    # @return the filled routes
+    def collect_routes(self, routes, target_cells, distinct, found):
+        for ant in range(self.ant_count):
+            for i in range(len(target_cells)):
+                if target_cells[i] in distinct:
+                    routes[ant][i] = found.get((ant, distinct[target_cells[i]]))
+                elif target_cells[i] >= 0:
+                    routes[ant][i] = Route(self.start)
+        return routes
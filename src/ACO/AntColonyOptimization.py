@@ -3,28 +3,59 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
 import time
 from src.Ant import Ant
+from src.AntBatch import AntBatch
 from src.Maze import Maze
+from src.ParallelColony import ParallelColony
 from src.PathSpecification import PathSpecification
+from src.RandomStream import RandomStream
 from src.Route import Route
+from src.RouteCache import RouteCache
+from src.Termination import Termination
 
 # Class representing the first assignment. Finds shortest path between two points in a maze according to a specific
 # path specification.
 class AntColonyOptimization:
 
+    # Engines that can walk the ants of a generation.
+    # serial walks one Ant after the other, batch walks all ants of a generation in lockstep with AntBatch,
+    # parallel spreads the ants of a generation over the worker processes of a ParallelColony.
+    MODES = ("serial", "batch", "parallel")
+
     # Constructs a new optimization object using ants.
     # @param maze the maze .
     # @param antsPerGen the amount of ants per generation.
     # @param generations the amount of generations.
     # @param Q normalization factor for the amount of dropped pheromone
     # @param evaporation the evaporation factor.
-    def __init__(self, maze, ants_per_gen, generations, q, evaporation):
+    # @param mode the engine used to walk the ants, one of MODES.
+    # @param workers the number of worker processes in parallel mode, defaults to the number of cpus.
+    # @param seed seed of the RandomStream all ants draw from, None for a random seed.
+    # @param pheromone_seed optional ShortestPath on the same maze, its exact route is laid down as a first
+    # pheromone trail before the ants start.
+    # @param cache optional RouteCache, routes in the cache are returned without running the ants.
+    # @param termination optional Termination deciding when a colony stops, by default it stops after the given
+    # amount of generations.
+    def __init__(self, maze, ants_per_gen, generations, q, evaporation, mode="serial", workers=None, seed=None,
+                 pheromone_seed=None, cache=None, termination=None):
+        if mode not in AntColonyOptimization.MODES:
+            raise ValueError("Unknown ant engine " + str(mode))
+        self.mode = mode
+        # only the batch engine finds the routes to many targets in a single colony run
+        self.shares_runs = mode == "batch"
+        self.workers = workers
+        self.seed = seed
+        self.rng = RandomStream(seed)
+        self.colony = None
+        self.pheromone_seed = pheromone_seed
+        self.cache = cache
         self.maze = maze
         self.ants_per_gen = ants_per_gen
         self.generations = generations
         self.q = q
         self.evaporation = evaporation
-        self.convergence = 2
-        self.generation_shortest = []
+        self.termination = termination
+        # number of steps of all the routes the ants found, for measuring throughput
+        self.route_steps = 0
 
     # Loop that starts the shortest path process
     # @param spec Specification of the route we wish to optimize
@@ -32,44 +63,177 @@ class AntColonyOptimization:
     def find_shortest_route(self, path_specification):
         if path_specification.start==path_specification.end:
             return Route(path_specification.start)
+        if self.cache is not None:
+            key = self.get_cache_key(path_specification.get_start(), path_specification.get_end())
+            route = self.cache.get(key, path_specification.get_start())
+            if route is not None:
+                return route
+            route = self.run_colony(path_specification)
+            if route.size() > 0:
+                self.cache.put(key, route)
+            return route
+        return self.run_colony(path_specification)
+
+    # Run the ant colony for a single route.
+    # @param path_specification Specification of the route we wish to optimize
+    # @return ACO optimized route
+    def run_colony(self, path_specification):
         self.maze.reset()
-        new_ant = Ant(self.maze, path_specification)
-        shortest = new_ant.find_route()
-        for i in range (self.generations):
+        if self.pheromone_seed is not None:
+            self.pheromone_seed.seed_pheromones(path_specification, self.q)
+        shortest = self.run_ants(path_specification, 1)[0]
+        termination = self.get_termination()
+        i = 0
+        while not termination.should_stop():
             routes = []
             print("gereration", str(i))
-            for ant in range(self.ants_per_gen):
-                # first initialize a path specification
-                new_ant = Ant(self.maze, path_specification)
-                route = new_ant.find_route()
+            for route in self.run_ants(path_specification, self.ants_per_gen):
                 if route.size() == 0:
                     print("Ant took too many steps aco")
                 else:
                     routes.append(route)
                     print("route length:", str(route.size()))
-                    if route.size() < shortest.size():
+                    if shortest.size() == 0 or route.size() < shortest.size():
                         shortest = route
-            mean = 0
-            if len(routes) > 0:
-                # check convergence
-                shortest_x = routes[0].size()
-                for i in range(1, len(routes)):
-                    shortest_x = min(shortest_x, routes[1].size())
-                self.generation_shortest.append(shortest_x)
-                check = True
-                if len(self.generation_shortest) > 1:
-                    if abs(self.generation_shortest[-1] - self.generation_shortest[-2]) > self.convergence:
-                        check = False
-                if check:
-                    print("The route length converged with mean ", str(mean))
-                    break
+            self.route_steps += sum(route.size() for route in routes)
+            # evaporate pheromone
+            self.maze.evaporate(self.evaporation)
+            # after all ants from given generation have finished, you have to update pheromones via maze
+            self.maze.add_pheromone_routes(routes, self.q)
+            termination.update(shortest.size() if shortest.size() > 0 else None)
+            i += 1
+
+        print("Colony stopped after " + str(i) + " generations: " + str(termination.reason))
+        return shortest
+
+    # Find the routes from one source to many targets.
+    # In batch mode this is a single colony run: every ant walks from the source until it has visited all targets,
+    # in lockstep with AntBatch, and the path it walked up to its first visit of a target is its route to that
+    # target. All those routes lay down pheromone, and the shortest route to every target over all generations is
+    # kept. The serial and parallel engines only walk ants to a single end, so in those modes every route gets a
+    # colony run of its own.
+    # @param source Start coordinate of all the routes
+    # @param targets List of end coordinates
+    # @return list with the ACO optimized route to every target, empty routes for targets no ant reached
+    def find_shortest_routes(self, source, targets):
+        if self.mode != "batch":
+            return [self.find_shortest_route(PathSpecification(source, target)) for target in targets]
+        if self.cache is None:
+            return self.run_target_colony(source, targets)
+        routes = [None] * len(targets)
+        keys = [self.get_cache_key(source, target) for target in targets]
+        missing = []
+        for t in range(len(targets)):
+            if targets[t] == source:
+                routes[t] = Route(source)
+            else:
+                routes[t] = self.cache.get(keys[t], source)
+            if routes[t] is None:
+                missing.append(t)
+        found = self.run_target_colony(source, [targets[t] for t in missing])
+        for t, route in zip(missing, found):
+            routes[t] = route
+            if route.size() > 0:
+                self.cache.put(keys[t], route)
+        return routes
+
+    # Run a single ant colony of AntBatch ants for the routes from one source to many targets.
+    # With a pheromone seed the exact routes to all targets are laid down first.
+    # @param source Start coordinate of all the routes
+    # @param targets List of end coordinates
+    # @return list with the ACO optimized route to every target
+    def run_target_colony(self, source, targets):
+        shortest = [None] * len(targets)
+        if len(targets) == 0:
+            return shortest
+        self.maze.reset()
+        if self.pheromone_seed is not None:
+            self.maze.add_pheromone_routes(self.pheromone_seed.find_shortest_routes(source, targets), self.q)
+        spec = PathSpecification(source, targets[0])
+        termination = self.get_termination()
+        i = 0
+        while not termination.should_stop():
+            routes = []
+            print("gereration", str(i))
+            for ant_routes in AntBatch(self.maze, spec, self.ants_per_gen, self.rng).find_target_routes(targets):
+                for t in range(len(targets)):
+                    route = ant_routes[t]
+                    if route is None:
+                        continue
+                    if route.size() > 0:
+                        routes.append(route)
+                    if shortest[t] is None or route.size() < shortest[t].size():
+                        shortest[t] = route
+            self.route_steps += sum(route.size() for route in routes)
             # evaporate pheromone
             self.maze.evaporate(self.evaporation)
             # after all ants from given generation have finished, you have to update pheromones via maze
             self.maze.add_pheromone_routes(routes, self.q)
+            # the colony is rated by the total length of its routes once every target has been reached
+            reached = all(route is not None for route in shortest)
+            termination.update(sum(route.size() for route in shortest) if reached else None)
+            i += 1
 
+        print("Colony stopped after " + str(i) + " generations: " + str(termination.reason))
+        for t in range(len(targets)):
+            if shortest[t] is None:
+                print("No ant reached " + str(targets[t]))
+                shortest[t] = Route(source)
         return shortest
 
+    # The termination criterion of a colony run, started anew.
+    # @return the Termination
+    def get_termination(self):
+        termination = self.termination
+        if termination is None:
+            termination = Termination(max_iterations=self.generations)
+        termination.start()
+        return termination
+
+    # Key of a route in the route cache, made from the maze, the coordinates and the colony parameters.
+    # A pheromone seed only counts as present or not, it is an exact solver and always lays down the same route.
+    # @param start start coordinate
+    # @param end end coordinate
+    # @return the cache key
+    def get_cache_key(self, start, end):
+        parameters = ("aco", self.ants_per_gen, self.generations, self.q, self.evaporation, self.mode, self.seed,
+                      self.pheromone_seed is not None)
+        if self.termination is not None:
+            termination = self.termination
+            parameters += (termination.max_iterations, termination.time_limit, termination.stagnation,
+                           termination.target, termination.tolerance)
+        return RouteCache.make_key(self.maze, start, end, parameters)
+
+    # Let a number of ants walk through the maze with the selected engine.
+    # @param path_specification Specification of the route the ants walk
+    # @param count Number of ants
+    # @return list with the route of every ant, empty routes for ants that did not reach the end
+    def run_ants(self, path_specification, count):
+        if self.mode == "batch":
+            return AntBatch(self.maze, path_specification, count, self.rng).find_routes()
+        if self.mode == "parallel":
+            if self.colony is None:
+                self.colony = ParallelColony(self.maze, self.workers)
+            return self.colony.run_ants(path_specification, count, self.rng)
+        routes = []
+        for ant in range(count):
+            # first initialize a path specification
+            new_ant = Ant(self.maze, path_specification, self.rng)
+            routes.append(new_ant.find_route())
+        return routes
+
+    # Stop the worker processes of the parallel mode, if they were started.
+    def close(self):
+        if self.colony is not None:
+            self.colony.close()
+            self.colony = None
+
+    # The worker pool is not copied along when the optimization object is pickled.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["colony"] = None
+        return state
+
 
 # Driver function for Assignment 1
 if __name__ == "__main__":
@@ -82,7 +246,9 @@ if __name__ == "__main__":
     #construct the optimization objects
     maze = Maze.create_maze("./../data/hard maze.txt")
     spec = PathSpecification.read_coordinates("./../data/hard coordinates.txt")
-    aco = AntColonyOptimization(maze, gen, no_gen, q, evap)
+    maze = maze.prune_dead_ends([spec.get_start(), spec.get_end()])
+    mode = sys.argv[1] if len(sys.argv) > 1 else "serial"
+    aco = AntColonyOptimization(maze, gen, no_gen, q, evap, mode)
 
     #save starting time
     start_time = int(round(time.time() * 1000))
@@ -90,8 +256,10 @@ if __name__ == "__main__":
     #run optimization
     shortest_route = aco.find_shortest_route(spec)
 
+    aco.close()
+
     #print time taken
-    print("Time taken: " + str((int(round(time.time() * 1000)) - start_time) / 1000.0))
+    print("Time taken (" + mode + "): " + str((int(round(time.time() * 1000)) - start_time) / 1000.0))
 
     #save solution
     shortest_route.write_to_file("./../data/hard_solution.txt")
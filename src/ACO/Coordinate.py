@@ -4,14 +4,37 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 from src.Direction import Direction
 
 # Class representing a coordinate.
+# Coordinates are immutable and hashable, so they can be used in sets and as dictionary keys. They only hold the
+# two slots x and y, without an attribute dictionary.
 class Coordinate:
 
+    __slots__ = ("x", "y")
+
+    # Unit steps along x and y for every direction, indexed by Direction.dir_to_int.
+    DELTA_X = (1, 0, -1, 0)
+    DELTA_Y = (0, -1, 0, 1)
+
      # Constructs a new coordinate object.
      # @param x the x coordinate
      # @param y the y coordinate
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Coordinate is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Coordinate is immutable")
+
+    # Coordinates are pickled by their x and y, the slots can not be set after construction.
+    def __reduce__(self):
+        return Coordinate, (self.x, self.y)
+
+    # Coordinates pickled before they had slots carry their x and y as a dictionary.
+    def __setstate__(self, state):
+        object.__setattr__(self, "x", state["x"])
+        object.__setattr__(self, "y", state["y"])
 
     # Add a coordinate to this coordinate
     # @param other the other coordinate to be added
@@ -24,7 +47,7 @@ class Coordinate:
     # @param dir direction of unit move
     # @return result the new coordinate
     def add_direction(self, dir):
-         return self.add_coordinate(self.dir_to_coordinate_delta(dir))
+        return Coordinate(self.x + Coordinate.DELTA_X[dir.value], self.y + Coordinate.DELTA_Y[dir.value])
 
     # Subtract a coordinate from the current coordinate
     # @param other the to be subtracted coordinate
@@ -48,8 +71,15 @@ class Coordinate:
     # @param other Other Coordinate to check
     # @return boolean whether they're equal
     def __eq__(self, other):
+        if not isinstance(other, Coordinate):
+            return NotImplemented
         return self.x == other.x and self.y == other.y
 
+    # Hash of a coordinate, equal coordinates have the same hash.
+    # @return hash of x and y
+    def __hash__(self):
+        return hash((self.x, self.y))
+
     # Check whether a point lies between a x range with [low,up)
     # @param low lower bound
     # @param up upper bound (non-inclusive)
@@ -78,14 +108,7 @@ class Coordinate:
     # @param dir the direction
     # @return the coordinate
     def dir_to_coordinate_delta(self, dir):
-        # all directions in a vector
-        # Creates a map with a direction linked to its (direction) vector.
-        map = {}
-        map[Direction.east] = Coordinate(1, 0)
-        map[Direction.west] = Coordinate(-1, 0)
-        map[Direction.north] = Coordinate(0, -1)
-        map[Direction.south] = Coordinate(0, 1)
-        return map[dir]
+        return Coordinate.DELTAS[dir.value]
 
     # Returns the direction from self to given coordinate
     def coordinate_to_dir(self, coordinate):
@@ -102,4 +125,8 @@ class Coordinate:
             return Direction.north
         else:
             print("wrong step",str(direction_coordinate.get_x()), ", y: ", str(direction_coordinate.get_y()))
-            return None
\ No newline at end of file
+            return None
+
+
+# The unit step of every direction, made once, indexed by Direction.dir_to_int.
+Coordinate.DELTAS = tuple(Coordinate(Coordinate.DELTA_X[d], Coordinate.DELTA_Y[d]) for d in range(4))
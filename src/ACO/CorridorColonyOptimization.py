@@ -0,0 +1,220 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import time
+import numpy as np
+from src.CorridorGraph import CorridorGraph
+from src.Maze import Maze
+from src.PathSpecification import PathSpecification
+from src.RandomStream import RandomStream
+from src.Route import Route
+from src.Termination import Termination
+
+# Ant colony optimization over the corridor graph of a maze.
+# The ants only make a decision at the junctions of the maze and walk a whole corridor in one step. Pheromone is
+# kept per corridor. An ant picks one of the corridors to nodes it has not visited yet in proportion to the
+# pheromone of the corridor divided by its length, and goes back along its path when there is none. The routes
+# the ants find over the graph are expanded back into routes over the tiles.
+class CorridorColonyOptimization:
+
+    # Constructs a new optimization object using ants on the corridor graph.
+    # @param maze the maze.
+    # @param ants_per_gen the amount of ants per generation.
+    # @param generations the amount of generations.
+    # @param q normalization factor for the amount of dropped pheromone
+    # @param evaporation the evaporation factor.
+    # @param protected Coordinates that are made nodes of the graph up front, like TSPData.get_locations.
+    # @param termination optional Termination deciding when a colony stops, by default it stops after the given
+    # amount of generations.
+    # @param seed seed of the RandomStream all ants draw from, None for a random seed.
+    def __init__(self, maze, ants_per_gen, generations, q, evaporation, protected=(), termination=None, seed=None):
+        self.maze = maze
+        self.rng = RandomStream(seed)
+        self.ants_per_gen = ants_per_gen
+        self.generations = generations
+        self.q = q
+        self.evaporation = evaporation
+        self.termination = termination
+        self.maximum_steps = 100000000
+        # find_shortest_routes finds the routes to many targets in a single colony run
+        self.shares_runs = True
+        # number of tile steps of all the walks the ants found, for measuring throughput
+        self.route_steps = 0
+        self.protected = list(protected)
+        self.graph = CorridorGraph(maze, self.protected)
+        # hash of the maze layout the graph was built for
+        self.layout = maze.get_hash()
+
+    # Loop that starts the shortest path process
+    # @param spec Specification of the route we wish to optimize
+    # @return ACO optimized route
+    def find_shortest_route(self, path_specification):
+        return self.find_shortest_routes(path_specification.get_start(), [path_specification.get_end()])[0]
+
+    # Find the routes from one source to many targets in a single colony run.
+    # Every ant walks from the source until it has visited all targets, and its path at its first visit of a
+    # target is its route to that target.
+    # @param source Start coordinate of all the routes
+    # @param targets List of end coordinates
+    # @return list with the ACO optimized route to every target, empty routes for targets no ant reached
+    def find_shortest_routes(self, source, targets):
+        graph = self.get_graph([source] + list(targets))
+        source_node = graph.get_node(source)
+        target_nodes = [graph.get_node(target) for target in targets]
+        shortest = self.run_colony(source_node, target_nodes)
+        routes = []
+        for t in range(len(targets)):
+            if targets[t] == source:
+                routes.append(Route(source))
+            elif shortest[t] is None:
+                print("No ant reached " + str(targets[t]))
+                routes.append(Route(source))
+            else:
+                routes.append(graph.expand_route(source_node, shortest[t][1]))
+        return routes
+
+    # The corridor graph, built again when the walls of the maze have changed, or with more protected tiles when
+    # a coordinate is not one of its nodes yet.
+    # @param coordinates Coordinates that have to be nodes
+    # @return the corridor graph
+    def get_graph(self, coordinates):
+        stale = self.layout != self.maze.get_hash()
+        missing = [position for position in coordinates
+                   if self.maze.get_cell(position) >= 0 and (stale or self.graph.get_node(position) < 0)]
+        self.protected.extend(position for position in missing if position not in self.protected)
+        if stale or len(missing) > 0:
+            self.graph = CorridorGraph(self.maze, self.protected)
+            self.layout = self.maze.get_hash()
+        return self.graph
+
+    # Run the ant colony on the corridor graph.
+    # @param source The node id the ants start at
+    # @param targets List of node ids to find routes to, -1 for coordinates that are walls
+    # @return list with a tuple (length, edges) of the shortest walk to every target, None where not reached
+    def run_colony(self, source, targets):
+        graph = self.graph
+        shortest = [None] * len(targets)
+        goals = {}
+        for t in range(len(targets)):
+            if targets[t] >= 0 and targets[t] != source:
+                goals.setdefault(targets[t], []).append(t)
+        if source < 0 or len(goals) == 0:
+            return shortest
+
+        pheromones = np.ones(graph.corridor_count, dtype=np.float64)
+        attraction = [1.0 / length for length in graph.edge_length]
+        termination = self.get_termination()
+        i = 0
+        while not termination.should_stop():
+            print("gereration", str(i))
+            pheromone_list = pheromones.tolist()
+            weights = [pheromone_list[corridor] * attraction[edge]
+                       for edge, corridor in enumerate(graph.edge_corridor.tolist())]
+            walks = []
+            for ant in range(self.ants_per_gen):
+                for t, walk in self.walk(source, goals, weights).items():
+                    walks.append(walk)
+                    if shortest[t] is None or walk[0] < shortest[t][0]:
+                        shortest[t] = walk
+            self.route_steps += sum(walk[0] for walk in walks)
+            # evaporate pheromone
+            pheromones *= 1 - self.evaporation
+            # every walk drops pheromone on its corridors
+            for length, edges in walks:
+                np.add.at(pheromones, graph.edge_corridor[edges], self.q / length)
+            reached = all(walk is not None for walk in shortest)
+            termination.update(sum(walk[0] for walk in shortest) if reached else None)
+            i += 1
+
+        print("Colony stopped after " + str(i) + " generations: " + str(termination.reason))
+        return shortest
+
+    # Let a single ant walk over the graph until it has visited all goals.
+    # @param source The node id the ant starts at
+    # @param goals dictionary from the node id of a goal to the indices of the targets at that node
+    # @param weights list with the weight of every edge for the choice of the ant
+    # @return dictionary from target index to a tuple (length, edges) of the walk to the first visit of the target
+    def walk(self, source, goals, weights):
+        graph = self.graph
+        adjacency = graph.adjacency
+        edge_to = graph.edge_to
+        edge_length = graph.edge_length
+        rng = self.rng
+        visited = bytearray(graph.node_count)
+        visited[source] = 1
+        node = source
+        path = []
+        nodes = [source]
+        length = 0
+        found = {}
+        remaining = len(goals)
+        steps = 0
+        while remaining > 0 and steps < self.maximum_steps:
+            steps += 1
+            options = [edge for edge in adjacency[node] if not visited[edge_to[edge]]]
+            if len(options) == 0:
+                # dead end, go back one corridor
+                if len(path) == 0:
+                    break
+                length -= edge_length[path.pop()]
+                nodes.pop()
+                node = nodes[-1]
+                continue
+            total = 0.0
+            for edge in options:
+                total += weights[edge]
+            random_value = rng.random() * total
+            chosen = options[-1]
+            for edge in options:
+                random_value -= weights[edge]
+                if random_value < 0:
+                    chosen = edge
+                    break
+            path.append(chosen)
+            length += edge_length[chosen]
+            node = edge_to[chosen]
+            nodes.append(node)
+            visited[node] = 1
+            if node in goals:
+                for t in goals[node]:
+                    found[t] = (length, list(path))
+                remaining -= 1
+        return found
+
+    # The termination criterion of a colony run, started anew.
+    # @return the Termination
+    def get_termination(self):
+        termination = self.termination
+        if termination is None:
+            termination = Termination(max_iterations=self.generations)
+        termination.start()
+        return termination
+
+
+# Driver function running the corridor colony on the hard maze.
+if __name__ == "__main__":
+    #parameters
+    gen = 10
+    no_gen = 10
+    q = 16000
+    evap = 0.1
+
+    #construct the optimization objects
+    maze = Maze.create_maze("./../data/hard maze.txt")
+    spec = PathSpecification.read_coordinates("./../data/hard coordinates.txt")
+    aco = CorridorColonyOptimization(maze, gen, no_gen, q, evap, [spec.get_start(), spec.get_end()])
+
+    #save starting time
+    start_time = int(round(time.time() * 1000))
+
+    #run optimization
+    shortest_route = aco.find_shortest_route(spec)
+
+    #print time taken
+    print("Time taken: " + str((int(round(time.time() * 1000)) - start_time) / 1000.0))
+
+    #save solution
+    shortest_route.write_to_file("./../data/hard_solution.txt")
+
+    #print route size
+    print("Route size: " + str(shortest_route.size()))
@@ -0,0 +1,104 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+from src.Route import Route
+
+# Class that compresses a maze into a graph of junctions and corridors.
+# Every accessible tile with exactly two accessible neighbours lies inside a corridor, there is nothing to decide
+# there. All other tiles, and the protected tiles like the start, the end and the product locations, are the
+# nodes of the graph. An edge is a corridor walked from one node to the next, with its length and the directions
+# of its steps, so a route over the graph can be expanded back into a route over the tiles.
+# Every corridor has an edge in both directions, the two edges share a corridor id.
+class CorridorGraph:
+
+    # Constructs the corridor graph of a maze.
+    # @param maze the maze.
+    # @param protected Coordinates of the tiles that must be nodes
+    def __init__(self, maze, protected=()):
+        self.maze = maze
+        degree = (maze.neighbours >= 0).sum(axis=1)
+        is_node = degree != 2
+        for position in protected:
+            cell = maze.get_cell(position)
+            if cell >= 0:
+                is_node[cell] = True
+        self.node_cells = np.nonzero(is_node)[0]
+        self.node_count = len(self.node_cells)
+        self.node_of_cell = np.full(maze.cell_count, -1, dtype=np.int32)
+        self.node_of_cell[self.node_cells] = np.arange(self.node_count, dtype=np.int32)
+        self.build_edges()
+
+    # Walk every corridor from both of its ends.
+    # Corridors leading back to the node they start at are left out, they are never part of a shortest route.
+    def build_edges(self):
+        neighbours = self.maze.get_neighbour_lists()[0]
+        node_of_cell = self.node_of_cell.tolist()
+        self.adjacency = [[] for node in range(self.node_count)]
+        edge_to = []
+        edge_length = []
+        edge_offsets = [0]
+        last_steps = []
+        directions = []
+        # edge id by the node it starts at and its first direction, to pair up the two edges of a corridor
+        edge_ids = {}
+        for node, cell in enumerate(self.node_cells.tolist()):
+            for direction in range(4):
+                current = neighbours[cell][direction]
+                if current < 0:
+                    continue
+                steps = [direction]
+                previous = cell
+                while node_of_cell[current] < 0:
+                    around = neighbours[current]
+                    step = 0
+                    while around[step] < 0 or around[step] == previous:
+                        step += 1
+                    steps.append(step)
+                    previous = current
+                    current = around[step]
+                if node_of_cell[current] == node:
+                    continue
+                edge_ids[(node, direction)] = len(edge_to)
+                self.adjacency[node].append(len(edge_to))
+                edge_to.append(node_of_cell[current])
+                edge_length.append(len(steps))
+                last_steps.append(steps[-1])
+                directions.extend(steps)
+                edge_offsets.append(len(directions))
+
+        self.edge_count = len(edge_to)
+        self.edge_to = edge_to
+        self.edge_length = edge_length
+        self.edge_offsets = np.array(edge_offsets, dtype=np.int64)
+        self.directions = np.array(directions, dtype=np.uint8)
+        twins = [edge_ids[(edge_to[edge], (last_steps[edge] + 2) % 4)] for edge in range(self.edge_count)]
+        corridors = np.minimum(np.arange(self.edge_count), np.array(twins, dtype=np.int64))
+        corridor_ids, self.edge_corridor = np.unique(corridors, return_inverse=True)
+        self.corridor_count = len(corridor_ids)
+        print("Corridor graph: " + str(self.node_count) + " nodes, " + str(self.corridor_count)
+              + " corridors for " + str(self.maze.cell_count) + " tiles")
+
+    # Node of a coordinate.
+    # @param position The coordinate
+    # @return the node id, -1 if the tile is not a node of the graph
+    def get_node(self, position):
+        cell = self.maze.get_cell(position)
+        if cell < 0:
+            return -1
+        return int(self.node_of_cell[cell])
+
+    # Coordinate of a node.
+    # @param node The node id
+    # @return the coordinate of its tile
+    def get_coordinate(self, node):
+        return self.maze.get_coordinate(self.node_cells[node])
+
+    # Turn a walk over the graph into a route over the tiles.
+    # @param source The node id the walk starts at
+    # @param edges Sequence of consecutive edge ids
+    # @return the route walking along all corridors of the edges
+    def expand_route(self, source, edges):
+        offsets = self.edge_offsets
+        steps = [self.directions[offsets[edge]:offsets[edge + 1]] for edge in edges]
+        return Route(self.get_coordinate(source), np.concatenate(steps).tobytes() if len(steps) > 0 else None)
@@ -1,37 +1,207 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
+import hashlib
+import mmap
 import traceback
+import numpy as np
 from src.Direction import Direction
 from src.Coordinate import Coordinate
+from src.Route import Route
 from src.SurroundingPheromone import SurroundingPheromone
 
 # Class that holds all the maze data. This means the pheromones, the open and blocked tiles in the system as
 # well as the starting and end coordinates.
 class Maze:
 
+    # Unit steps along x and y for every direction, indexed by Direction.dir_to_int.
+    DELTA_X = np.array([1, 0, -1, 0], dtype=np.intp)
+    DELTA_Y = np.array([0, -1, 0, 1], dtype=np.intp)
+
     # Constructor of a maze
     # @param walls int array of tiles accessible (1) and non-accessible (0)
     # @param width width of Maze (horizontal)
     # @param length length of Maze (vertical)
     def __init__(self, walls, width, length):
-        self.walls = walls
+        self.walls = np.asarray(walls, dtype=np.uint8)
         self.length = length
         self.width = width
-        self.pheromones = []
+        # boolean mask of the accessible tiles, indexed as [x][y] like the walls
+        self.open_mask = self.walls != 0
+        self.wall_hash = None
+        self.pheromones = np.zeros((width, length), dtype=np.float64)
+        # flat view on the pheromones, shares memory with self.pheromones
+        self.flat_pheromones = self.pheromones.reshape(-1)
+        self.build_cell_index()
         self.initialize_pheromones()
 
+    # Build the compact index of the accessible tiles and their neighbour table.
+    # Every open tile gets an integer cell id, numbered column by column. The neighbour table holds for
+    # every cell id the cell ids of its neighbours in Direction order (east, north, west, south),
+    # with -1 for walls and positions outside of the maze.
+    def build_cell_index(self):
+        xs, ys = np.nonzero(self.open_mask)
+        self.cell_x = xs.astype(np.int32)
+        self.cell_y = ys.astype(np.int32)
+        self.cell_count = len(xs)
+        # flat index into the pheromone array of every cell
+        self.cell_flat = (xs * self.length + ys).astype(np.intp)
+
+        padded = np.full((self.width + 2, self.length + 2), -1, dtype=np.int32)
+        padded[1:-1, 1:-1][self.open_mask] = np.arange(self.cell_count, dtype=np.int32)
+        self.cell_ids = padded[1:-1, 1:-1]
+
+        self.neighbours = np.empty((self.cell_count, 4), dtype=np.int32)
+        for d in range(4):
+            self.neighbours[:, d] = padded[xs + 1 + Maze.DELTA_X[d], ys + 1 + Maze.DELTA_Y[d]]
+        self.neighbour_lists = None
+        self.neighbour_flat_lists = None
+        self.visit_marks = None
+        self.visit_stamp = 0
+
+    # Plain python copies of the neighbour table for the scalar per step lookups of the ants.
+    # They take far more memory than the table itself, so they are only made on first use.
+    # @return tuple of the neighbour cell ids and the flat pheromone indices of the neighbours of every cell
+    def get_neighbour_lists(self):
+        if self.neighbour_lists is None:
+            neighbour_flat = np.where(self.neighbours >= 0, self.cell_flat[self.neighbours], -1)
+            self.neighbour_flat_lists = neighbour_flat.tolist()
+            self.neighbour_lists = self.neighbours.tolist()
+        return self.neighbour_lists, self.neighbour_flat_lists
+
+    # The flat pheromone view is dropped when pickling and recreated on load, so it keeps sharing memory
+    # with the pheromones of the copy. The neighbour lists are made again on first use.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["flat_pheromones"]
+        state["neighbour_lists"] = None
+        state["neighbour_flat_lists"] = None
+        state["visit_marks"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.flat_pheromones = self.pheromones.reshape(-1)
+
+    # Change the layout of the maze in place, for instance when a shelf is moved.
+    # The cell index is built again, so cell ids from before the change are no longer valid, and the
+    # pheromones are reset.
+    # @param opened Coordinates of the tiles that become accessible
+    # @param closed Coordinates of the tiles that become walls
+    def apply_wall_diff(self, opened=(), closed=()):
+        for position in opened:
+            if not self.in_bounds(position):
+                raise ValueError("Opened tile outside of the maze: " + str(position))
+            self.walls[position.get_x(), position.get_y()] = 1
+        for position in closed:
+            if not self.in_bounds(position):
+                raise ValueError("Closed tile outside of the maze: " + str(position))
+            self.walls[position.get_x(), position.get_y()] = 0
+        self.open_mask = self.walls != 0
+        self.wall_hash = None
+        self.build_cell_index()
+        self.reset()
+
+    # Maze with all dead end corridors filled in.
+    # A dead end is an accessible tile with at most one accessible neighbour. Filling it can turn its neighbour
+    # into a dead end, so the dead ends are filled round by round until none are left. Protected tiles, like the
+    # start, the end and the product locations, are never filled. No route between protected tiles goes through a
+    # dead end, so the shortest routes between them stay the same while the ants have far fewer tiles to explore.
+    # @param protected Coordinates of the tiles that must stay accessible
+    # @return a new maze with the dead ends turned into walls
+    def prune_dead_ends(self, protected=()):
+        keep = np.zeros(self.cell_count, dtype=bool)
+        for position in protected:
+            cell = self.get_cell(position)
+            if cell >= 0:
+                keep[cell] = True
+        open_neighbours = self.neighbours >= 0
+        degree = open_neighbours.sum(axis=1)
+        filled = np.zeros(self.cell_count, dtype=bool)
+        dead = np.nonzero((degree <= 1) & ~keep)[0]
+        while len(dead) > 0:
+            filled[dead] = True
+            around = self.neighbours[dead][open_neighbours[dead]]
+            np.subtract.at(degree, around, 1)
+            around = np.unique(around)
+            dead = around[(degree[around] <= 1) & ~keep[around] & ~filled[around]]
+        walls = self.walls.copy()
+        walls[self.cell_x[filled], self.cell_y[filled]] = 0
+        print("Pruned " + str(int(filled.sum())) + " dead end tiles")
+        return Maze(walls, self.width, self.length)
+
+    # Hash of the layout of the maze, equal for mazes with the same dimensions and walls.
+    # @return hexadecimal sha256 hash
+    def get_hash(self):
+        if self.wall_hash is None:
+            digest = hashlib.sha256((str(self.width) + " " + str(self.length) + "\n").encode())
+            digest.update(np.packbits(self.open_mask).tobytes())
+            self.wall_hash = digest.hexdigest()
+        return self.wall_hash
+
+    # Cell id of a coordinate.
+    # @param position The coordinate to look up
+    # @return the cell id, or -1 if the position is a wall or outside of the maze
+    def get_cell(self, position):
+        if not self.in_bounds(position):
+            return -1
+        return int(self.cell_ids[position.get_x(), position.get_y()])
+
+    # Coordinate of a cell id.
+    # @param cell The cell id
+    # @return the coordinate of the cell
+    def get_coordinate(self, cell):
+        return Coordinate(int(self.cell_x[cell]), int(self.cell_y[cell]))
+
+    # Cell ids of the neighbours of a cell.
+    # @param cell The cell id
+    # @return list of the 4 neighbour ids in Direction order, -1 where there is no accessible tile
+    def get_neighbours(self, cell):
+        if self.neighbour_lists is None:
+            self.get_neighbour_lists()
+        return self.neighbour_lists[cell]
+
+    # Turn a path of cell ids into a route.
+    # @param path Sequence of consecutive neighbouring cell ids
+    # @return the route walking along the path
+    def create_route(self, path):
+        path = np.asarray(path, dtype=np.intp)
+        steps = np.argmax(self.neighbours[path[:-1]] == path[1:, None], axis=1)
+        return Route(self.get_coordinate(path[0]), steps.astype(np.uint8).tobytes())
+
+    # Set the pheromone of a cell to zero, closing it for the ants.
+    # @param cell The cell id
+    def set_cell_zero(self, cell):
+        self.flat_pheromones[self.cell_flat[cell]] = 0
+
+    # Start a new walk on the visit marks of the maze.
+    # A cell is visited in the current walk when its mark equals the returned stamp, so a new walk does not have to
+    # clear the marks of the walks before it.
+    # @return tuple of the list of marks indexed by cell id and the stamp of the new walk
+    def new_visit_stamp(self):
+        if self.visit_marks is None:
+            self.visit_marks = [0] * self.cell_count
+        self.visit_stamp += 1
+        return self.visit_marks, self.visit_stamp
+
+    # Pheromones on the neighbours of a cell.
+    # @param cell The cell id
+    # @return list of the 4 neighbour pheromones in Direction order, 0 for walls and out of bounds
+    def get_neighbour_pheromones(self, cell):
+        if self.neighbour_flat_lists is None:
+            self.get_neighbour_lists()
+        flat = self.flat_pheromones
+        return [flat.item(i) if i >= 0 else 0.0 for i in self.neighbour_flat_lists[cell]]
+
+    # Pheromone getter
+    # @return width x length float array of the pheromones
     def get_pher(self):
         return self.pheromones
 
     # Initialize pheromones to a start value.
+    # The array is overwritten in place, so views handed out by get_pher stay valid.
     def initialize_pheromones(self):
-        self.pheromones = []
-        for i in range(self.width):  # row
-            self.pheromones.append([])
-        for i in range(self.width):
-            for j in range(self.length):
-                self.pheromones[i].append(self.walls[i][j])
+        self.pheromones[...] = self.open_mask
         return
 
     # Reset the maze for a new shortest path problem.
@@ -44,33 +214,46 @@ class Maze:
     # Ola did this method. It goes over the given route and updates the pheromone.
     # You shouldn't call this method, call add_pheromone_routes
     def add_pheromone_route(self, route, q):
-        factor = q/route.size()
-        start = route.get_start()
-        path = route.get_route()
-        for i in range(len(path)):
-            a = path[i]
-            start = start.add_direction(Direction(a))
-            self.pheromones[start.get_x()][start.get_y()] += factor
-        return
+        self.add_pheromone_routes([route], q)
 
     # Update pheromones for a list of routes
+    # All the cells of all the routes are gathered first and deposited with a single scatter-add,
+    # so cells visited by several routes (or several times by one route) receive every deposit.
     # @param routes A list of routes
     # @param Q Normalization factor for amount of dropped pheromone
     def add_pheromone_routes(self, routes, q):
-        for r in routes:
-            self.add_pheromone_route(r, q)
+        xs = []
+        ys = []
+        amounts = []
+        for route in routes:
+            if route.size() == 0:
+                continue
+            x, y = Maze.route_cells(route)
+            xs.append(x)
+            ys.append(y)
+            amounts.append(np.full(len(x), q / route.size()))
+        if len(xs) == 0:
+            return
+        np.add.at(self.pheromones, (np.concatenate(xs), np.concatenate(ys)), np.concatenate(amounts))
 
     # Evaporate pheromone
     # @param rho evaporation factor
-    # Ola did this method.
-    # It updates all cells in pheromones array. It doesn't return anything.
+    # It updates all cells in pheromones array in place. It doesn't return anything.
     def evaporate(self, rho):
-        for i in range(self.width):
-            for j in range(self.length):
-                x = self.pheromones[i][j]
-                self.pheromones[i][j] = (1-rho)*x
+        self.pheromones *= (1 - rho)
         return
 
+    # Coordinates of the cells a route steps on, excluding its start.
+    # @param route The route to follow
+    # @return tuple of x and y index arrays
+    @staticmethod
+    def route_cells(route):
+        directions = np.frombuffer(route.get_directions(), dtype=np.uint8).astype(np.intp)
+        start = route.get_start()
+        xs = start.get_x() + np.cumsum(Maze.DELTA_X[directions])
+        ys = start.get_y() + np.cumsum(Maze.DELTA_Y[directions])
+        return xs, ys
+
     # Width getter
     # @return width of the maze
     def get_width(self):
@@ -83,51 +266,39 @@ class Maze:
 
     # Returns a the amount of pheromones on the neighbouring positions (N/S/E/W).
     # @param position The Coordinates of position to check the neighbours of.
+    # @param directions Directions to leave out, their pheromone is reported as 0.
     # @return SurroundingPheromone class with the pheromones of the neighbouring positions.
     def get_surrounding_pheromone_exclude(self, position, directions):
-        integer = 0
-        east, north, south, west = 0, 0, 0, 0
-        dir_prev = []
+        pheromones = self.get_position_pheromones(position)
         for i in directions:
-            dir_prev.append(Direction.dir_to_int(i))
-        pos = [position.add_direction(Direction(0)), position.add_direction(Direction(1)),
-               position.add_direction(Direction(2)), position.add_direction(Direction(3))]
-        if self.in_bounds(pos[0])and 0 not in dir_prev:
-            east = self.get_pheromone(pos[0])
-        if self.in_bounds(pos[1]) and 1 not in dir_prev:
-            north = self.get_pheromone(pos[1])
-        if self.in_bounds(pos[2]) and 2 not in dir_prev:
-            west = self.get_pheromone(pos[2])
-        if self.in_bounds(pos[3]) and 3 not in dir_prev:
-            south = self.get_pheromone(pos[3])
-        return SurroundingPheromone(north, east, south, west)
+            pheromones[Direction.dir_to_int(i)] = 0
+        return SurroundingPheromone(pheromones[1], pheromones[0], pheromones[3], pheromones[2])
 
     # Returns a the amount of pheromones on the neighbouring positions (N/S/E/W).
     # @param position The Coordinates of position to check the neighbours of.
     # @return SurroundingPheromone class with the pheromones of the neighbouring positions.
     def get_surrounding_pheromone(self, position):
-        east, north, south, west = 0, 0, 0, 0
-        pos = [position.add_direction(Direction(0)), position.add_direction(Direction(1)),
-               position.add_direction(Direction(2)), position.add_direction(Direction(3))]
-        if self.in_bounds(pos[0]):
-            east = self.get_pheromone(pos[0])
-        if self.in_bounds(pos[1]):
-            north = self.get_pheromone(pos[1])
-        if self.in_bounds(pos[2]):
-            west = self.get_pheromone(pos[2])
-        if self.in_bounds(pos[3]):
-            south = self.get_pheromone(pos[3])
-        return SurroundingPheromone(north, east, south, west)
+        pheromones = self.get_position_pheromones(position)
+        return SurroundingPheromone(pheromones[1], pheromones[0], pheromones[3], pheromones[2])
+
+    # Neighbour pheromones of a coordinate, looked up through the cell index.
+    # @param position Accessible coordinate, walls have no neighbours in the index
+    # @return list of the 4 neighbour pheromones in Direction order
+    def get_position_pheromones(self, position):
+        cell = self.get_cell(position)
+        if cell < 0:
+            return [0.0, 0.0, 0.0, 0.0]
+        return self.get_neighbour_pheromones(cell)
 
     def set_zero(self, position):
-        self.pheromones[position.get_x()][position.get_y()] = 0
+        self.pheromones[position.get_x(), position.get_y()] = 0
 
     # Pheromone getter for a specific position. If the position is not in bounds returns 0
     # @param pos Position coordinate
     # @return pheromone at point
     def get_pheromone(self, pos):
-        x = self.pheromones[pos.get_x()][pos.get_y()]
-        return x
+        x = self.pheromones[pos.get_x(), pos.get_y()]
+        return float(x)
 
     # Check whether a coordinate lies in the current maze.
     # @param position The position to be checked
@@ -151,31 +322,67 @@ class Maze:
         return string
 
     # Method that builds a mze from a file
+    # With a cache directory the parsed walls are also stored there as a .npy file, and later runs load them
+    # from there as long as the maze file has the same path, size and modification time.
     # @param filePath Path to the file
+    # @param cache_directory optional directory for the parsed walls
     # @return A maze object with pheromones initialized to 0's inaccessible and 1's accessible.
     @staticmethod
-    def create_maze(file_path):
+    def create_maze(file_path, cache_directory=None):
         try:
-            f = open(file_path, "r")
-            lines = f.read().splitlines()
-            dimensions = lines[0].split(" ")
-            width = int(dimensions[0])
-            length = int(dimensions[1])
-            
-            # make the maze_layout
-            maze_layout = []
-            for x in range(width):
-                maze_layout.append([])
-            
-            for y in range(length):
-                line = lines[y+1].split(" ")
-                for x in range(width):
-                    if line[x] != "":
-                        state = int(line[x])
-                        maze_layout[x].append(state)
-            print("Ready reading maze file " + file_path)
-            return Maze(maze_layout, width, length)
+            cache_path = None
+            if cache_directory is not None:
+                cache_path = Maze.get_cache_path(file_path, cache_directory)
+                if os.path.exists(cache_path):
+                    walls = np.load(cache_path)
+                    print("Ready reading maze file " + file_path + " from cache")
+                    return Maze(walls, walls.shape[0], walls.shape[1])
+            walls = Maze.read_walls(file_path)
         except FileNotFoundError:
             print("Error reading maze file " + file_path)
             traceback.print_exc()
-            sys.exit()
\ No newline at end of file
+            sys.exit()
+        if cache_path is not None:
+            os.makedirs(cache_directory, exist_ok=True)
+            temporary = cache_path + ".tmp"
+            with open(temporary, "wb") as f:
+                np.save(f, walls)
+            os.replace(temporary, cache_path)
+        print("Ready reading maze file " + file_path)
+        return Maze(walls, walls.shape[0], walls.shape[1])
+
+    # Parse the walls of a maze file.
+    # The file is memory mapped and every digit after the dimensions line is taken as a tile, row by row, without
+    # splitting it into lines and strings. Files with tiles of more than one digit are read with numpy.fromfile.
+    # @param file_path Path to the file
+    # @return width x length uint8 array of the tiles, indexed as [x][y]
+    @staticmethod
+    def read_walls(file_path):
+        with open(file_path, "rb") as f:
+            dimensions = f.readline().split()
+            width = int(dimensions[0])
+            length = int(dimensions[1])
+            offset = f.tell()
+            tiles = None
+            if os.fstat(f.fileno()).st_size > offset:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    text = np.frombuffer(data, dtype=np.uint8, offset=offset)
+                    digits = text[(text >= ord("0")) & (text <= ord("9"))]
+                    # the array must not point into the mapping when it is closed
+                    del text
+                if len(digits) == width * length:
+                    tiles = digits - ord("0")
+            if tiles is None:
+                f.seek(offset)
+                tiles = np.fromfile(f, dtype=np.int64, sep=" ")[:width * length].astype(np.uint8)
+        return np.ascontiguousarray(tiles.reshape(length, width).T)
+
+    # Path of the cached walls of a maze file.
+    # @param file_path Path to the maze file
+    # @param cache_directory directory of the cache
+    # @return path of the .npy file
+    @staticmethod
+    def get_cache_path(file_path, cache_directory):
+        status = os.stat(file_path)
+        key = os.path.realpath(file_path) + "\n" + str(status.st_size) + "\n" + str(status.st_mtime_ns)
+        return os.path.join(cache_directory, hashlib.sha256(key.encode()).hexdigest() + ".npy")
@@ -0,0 +1,275 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+from src.Coordinate import Coordinate
+from src.Maze import Maze
+from src.PathSpecification import PathSpecification
+from src.RandomStream import RandomStream
+
+# Class that generates mazes of any size with matching coordinate and product files.
+# Layouts:
+# - perfect: a maze without loops, carved with Eller's algorithm. The tiles with two even coordinates are the
+#   cells of the maze, the tiles between them are opened to connect the cells.
+# - braided: a perfect maze where every wall between two cells that are connected already is opened with
+#   probability braid, which makes loops and shorter detours.
+# - warehouse: an open floor with blocks of shelving two tiles deep, separated by aisles, with a free aisle along
+#   the walls. Products are placed in front of the shelves.
+# Eller's algorithm only keeps the state of one row of cells, and the warehouse rows follow from their position,
+# so the tiles are made row by row and written to disk without holding the maze in memory.
+# The same seed always gives the same maze and products.
+class MazeGenerator:
+
+    LAYOUTS = ("perfect", "braided", "warehouse")
+
+    # Constructs a new maze generator.
+    # @param width the width of the maze.
+    # @param length the length of the maze.
+    # @param layout one of LAYOUTS.
+    # @param braid probability of opening a wall between connected cells, for the braided layout.
+    # @param aisle_width width of the aisles, for the warehouse layout.
+    # @param shelf_length length of a block of shelving between two cross aisles, for the warehouse layout.
+    # @param seed seed of the maze and the products, None for a random seed.
+    def __init__(self, width, length, layout="perfect", braid=0.1, aisle_width=1, shelf_length=8, seed=None):
+        if layout not in MazeGenerator.LAYOUTS:
+            raise ValueError("Unknown maze layout " + str(layout))
+        if width < 1 or length < 1:
+            raise ValueError("A maze needs at least one tile, not " + str(width) + " by " + str(length))
+        if aisle_width < 1 or shelf_length < 1:
+            raise ValueError("Aisles and shelves need a size of at least one tile")
+        self.width = width
+        self.length = length
+        self.layout = layout
+        self.braid = braid if layout == "braided" else 0.0
+        self.aisle_width = aisle_width
+        self.shelf_length = shelf_length
+        # separate seeds for the tiles and the products, so the products do not change with the maze parameters
+        self.maze_seed, self.product_seed = RandomStream(seed).seed_sequence.spawn(2)
+
+    # The rows of tiles of the maze, one at a time.
+    # @return iterator over uint8 arrays with the tiles of every y, 1 for accessible and 0 for walls
+    def generate_rows(self):
+        if self.layout == "warehouse":
+            return (1 - self.get_shelves(y) for y in range(self.length))
+        return self.generate_cell_rows(RandomStream(self.maze_seed))
+
+    # Carve the rows of a perfect or braided maze with Eller's algorithm.
+    # Every cell of a row has the label of its set, cells with the same label are connected. Neighbouring cells of
+    # different sets are joined at random, and every set goes down to the next row at least once so it stays
+    # connected to the rest. The last row joins all sets that are left.
+    # For a braided maze the walls between cells of the same set are opened with probability braid. A wall to the
+    # row below is only known to lie between connected cells once the next row has been joined, so the tiles between
+    # two rows are held back until then.
+    # @param rng RandomStream of the maze
+    # @return iterator over uint8 arrays with the tiles of every y
+    def generate_cell_rows(self, rng):
+        columns = (self.width + 1) // 2
+        rows = (self.length + 1) // 2
+        braid = self.braid
+        labels = list(range(columns))
+        # labels of the sets of the cells above, and the tiles between the rows, waiting for the braiding
+        above = None
+        between = None
+        for r in range(rows):
+            last = r == rows - 1
+            parent = list(range(columns))
+
+            def find(label):
+                while parent[label] != label:
+                    parent[label] = parent[parent[label]]
+                    label = parent[label]
+                return label
+
+            tiles = np.zeros(self.width, dtype=np.uint8)
+            tiles[0:2 * columns:2] = 1
+            joins = rng.random_block(columns).tolist()
+            braids = rng.random_block(columns).tolist() if braid > 0 else None
+            for i in range(columns - 1):
+                a = find(labels[i])
+                b = find(labels[i + 1])
+                if (a != b and (last or joins[i] < 0.5)) or (a == b and braids is not None and braids[i] < braid):
+                    parent[b] = a
+                    tiles[2 * i + 1] = 1
+            if between is not None:
+                if braid > 0:
+                    lifts = rng.random_block(columns).tolist()
+                    for i in range(columns):
+                        if between[2 * i] == 0 and lifts[i] < braid and find(above[i]) == find(labels[i]):
+                            between[2 * i] = 1
+                yield between
+            yield tiles
+            if last:
+                break
+
+            roots = [find(label) for label in labels]
+            downs = rng.random_block(columns).tolist()
+            picks = rng.random_block(columns).tolist()
+            down = [value < 0.5 for value in downs]
+            # every set goes down at least once, at a cell picked by reservoir sampling over its members
+            members = {}
+            choice = {}
+            going = set()
+            for i in range(columns):
+                root = roots[i]
+                members[root] = members.get(root, 0) + 1
+                if picks[i] * members[root] < 1:
+                    choice[root] = i
+                if down[i]:
+                    going.add(root)
+            for root, i in choice.items():
+                if root not in going:
+                    down[i] = True
+
+            # the cells below keep the set they come from, the other cells start a set of their own
+            below = {}
+            for i in range(columns):
+                if down[i] and roots[i] not in below:
+                    below[roots[i]] = len(below)
+            above = [below[root] for root in roots]
+            fresh = len(below)
+            for i in range(columns):
+                if down[i]:
+                    labels[i] = below[roots[i]]
+                else:
+                    labels[i] = fresh
+                    fresh += 1
+            between = np.zeros(self.width, dtype=np.uint8)
+            between[0:2 * columns:2] = down
+        if self.length % 2 == 0:
+            yield np.zeros(self.width, dtype=np.uint8)
+
+    # The shelves of a warehouse row.
+    # @param y the row
+    # @return uint8 array with 1 for the tiles with shelving
+    def get_shelves(self, y):
+        shelves = np.zeros(self.width, dtype=np.uint8)
+        aisle = self.aisle_width
+        offset = y - aisle
+        if offset < 0 or y >= self.length - aisle or offset % (2 + aisle) >= 2:
+            return shelves
+        x = np.arange(aisle, max(aisle, self.width - aisle))
+        shelves[x] = (x - aisle) % (self.shelf_length + aisle) < self.shelf_length
+        return shelves
+
+    # Generate the whole maze in memory.
+    # @return the maze
+    def generate_maze(self):
+        walls = np.empty((self.length, self.width), dtype=np.uint8)
+        for y, tiles in enumerate(self.generate_rows()):
+            walls[y] = tiles
+        return Maze(np.ascontiguousarray(walls.T), self.width, self.length)
+
+    # The start and end of the maze, in opposite corners.
+    # @return the path specification
+    def get_specification(self):
+        if self.layout == "warehouse":
+            return PathSpecification(Coordinate(0, 0), Coordinate(self.width - 1, self.length - 1))
+        end_x = 2 * ((self.width - 1) // 2)
+        end_y = 2 * ((self.length - 1) // 2)
+        return PathSpecification(Coordinate(0, 0), Coordinate(end_x, end_y))
+
+    # Pick distinct product locations.
+    # In a perfect or braided maze products are on cells other than the start and the end, in a warehouse they
+    # are on the tiles in front of the shelves.
+    # @param count the number of products
+    # @return list of Coordinates
+    def get_product_locations(self, count):
+        rng = RandomStream(self.product_seed)
+        if self.layout == "warehouse":
+            return self.get_shelf_locations(rng, count)
+        columns = (self.width + 1) // 2
+        rows = (self.length + 1) // 2
+        available = columns * rows - 2
+        if count > max(available, 0):
+            raise ValueError("A maze of " + str(self.width) + " by " + str(self.length) + " has room for "
+                             + str(max(available, 0)) + " products, not " + str(count))
+        cells = (rng.generator.choice(available, size=count, replace=False) + 1).tolist()
+        return [Coordinate(2 * (cell % columns), 2 * (cell // columns)) for cell in cells]
+
+    # Pick distinct tiles in front of the shelves of a warehouse.
+    # The first pass counts the tiles per row and the second one finds the picked tiles, so only three rows of
+    # shelves are in memory at a time.
+    # @param rng RandomStream of the products
+    # @param count the number of products
+    # @return list of Coordinates in random order
+    def get_shelf_locations(self, rng, count):
+        counts = [int(np.count_nonzero(self.get_shelf_fronts(y))) for y in range(self.length)]
+        available = sum(counts)
+        if count > available:
+            raise ValueError("The warehouse has room for " + str(available) + " products, not " + str(count))
+        picked = np.sort(rng.generator.choice(available, size=count, replace=False)).tolist()
+        locations = []
+        first = 0
+        index = 0
+        for y in range(self.length):
+            if index < count and picked[index] < first + counts[y]:
+                xs = np.nonzero(self.get_shelf_fronts(y))[0]
+                while index < count and picked[index] < first + counts[y]:
+                    locations.append(Coordinate(int(xs[picked[index] - first]), y))
+                    index += 1
+            first += counts[y]
+        return [locations[i] for i in rng.generator.permutation(count).tolist()]
+
+    # The accessible tiles of a warehouse row next to a shelf above or below them.
+    # @param y the row
+    # @return boolean array
+    def get_shelf_fronts(self, y):
+        fronts = np.zeros(self.width, dtype=bool)
+        if y > 0:
+            fronts |= self.get_shelves(y - 1) == 1
+        if y < self.length - 1:
+            fronts |= self.get_shelves(y + 1) == 1
+        return fronts & (self.get_shelves(y) == 0)
+
+    # Stream the maze to a file in the format of Maze.create_maze.
+    # @param file_path Path to the maze file
+    def write_maze(self, file_path):
+        line = np.full(2 * self.width + 1, ord(" "), dtype=np.uint8)
+        line[-1] = ord("\n")
+        with open(file_path, "wb") as f:
+            f.write((str(self.width) + " " + str(self.length) + " \n").encode())
+            for tiles in self.generate_rows():
+                line[0:2 * self.width:2] = tiles + ord("0")
+                f.write(line.tobytes())
+        print("Ready writing maze file " + file_path)
+
+    # Write the start and end to a file in the format of PathSpecification.read_coordinates.
+    # @param file_path Path to the coordinate file
+    def write_coordinates(self, file_path):
+        spec = self.get_specification()
+        with open(file_path, "w") as f:
+            f.write(str(spec.get_start()) + ";\n" + str(spec.get_end()) + ";\n")
+
+    # Write product locations to a file in the format of TSPData.read_specification.
+    # @param file_path Path to the product file
+    # @param count the number of products
+    def write_products(self, file_path, count):
+        locations = self.get_product_locations(count)
+        with open(file_path, "w") as f:
+            f.write(str(count) + ";\n")
+            for i in range(count):
+                f.write(str(i + 1) + ": " + str(locations[i]) + ";\n")
+
+    # Write the maze, coordinate and product files of an instance, named like the assignment files.
+    # @param directory the directory of the files
+    # @param name the name of the instance
+    # @param products the number of products, no product file is written for 0
+    def write_instance(self, directory, name, products=0):
+        self.write_maze(os.path.join(directory, name + " maze.txt"))
+        self.write_coordinates(os.path.join(directory, name + " coordinates.txt"))
+        if products > 0:
+            self.write_products(os.path.join(directory, name + " products.txt"), products)
+
+
+# Driver function generating the files of a maze.
+# Usage: MazeGenerator.py [name] [layout] [width] [length] [products] [seed]
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else "generated"
+    layout = sys.argv[2] if len(sys.argv) > 2 else "braided"
+    width = int(sys.argv[3]) if len(sys.argv) > 3 else 1001
+    length = int(sys.argv[4]) if len(sys.argv) > 4 else width
+    products = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    seed = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+
+    generator = MazeGenerator(width, length, layout, seed=seed)
+    generator.write_instance("./../data", name, products)
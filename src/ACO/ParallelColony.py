@@ -0,0 +1,105 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from src.Ant import Ant
+from src.Maze import Maze
+from src.RandomStream import RandomStream
+
+# Class that walks the ants of a generation on a pool of worker processes.
+# The walls are sent to every worker once, when the pool starts, and the pool is started again when the walls of
+# the maze have changed, for instance by Maze.apply_wall_diff. The pheromones are published through a shared
+# memory block before each generation, so the Maze is never pickled per task. Every task copies the shared
+# pheromones into the private maze of its worker, so dead ends closed by its ants stay local to that task.
+# Every task gets its own stream spawned from the random stream of the caller, which makes runs with the same
+# seed reproducible no matter which worker picks up which task.
+class ParallelColony:
+
+    # Maze and shared pheromone view of the worker process, set by init_worker.
+    worker_maze = None
+    worker_memory = None
+    worker_pheromones = None
+
+    # Constructs the worker pool for a maze.
+    # @param maze the maze the ants walk in.
+    # @param workers the number of worker processes, defaults to the number of cpus.
+    def __init__(self, maze, workers=None):
+        self.maze = maze
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.memory = shared_memory.SharedMemory(create=True, size=maze.get_pher().nbytes)
+        self.pheromones = np.ndarray(maze.get_pher().shape, dtype=np.float64, buffer=self.memory.buf)
+        self.executor = None
+        self.start_workers()
+
+    # Start the worker pool on the current walls of the maze.
+    def start_workers(self):
+        maze = self.maze
+        # hash of the maze layout the workers were started with
+        self.layout = maze.get_hash()
+        self.executor = ProcessPoolExecutor(self.workers, initializer=ParallelColony.init_worker,
+                                            initargs=(maze.walls, maze.get_width(), maze.get_length(),
+                                                      self.memory.name))
+
+    # Let a number of ants walk through the current pheromones of the maze.
+    # @param path_specification Specification of the route the ants walk
+    # @param count Number of ants
+    # @param rng RandomStream the streams of the tasks are spawned from, the default stream if not given.
+    # @return list with the route of every ant, empty routes for ants that did not reach the end
+    def run_ants(self, path_specification, count, rng=None):
+        if rng is None:
+            rng = RandomStream.get_default()
+        if self.layout != self.maze.get_hash():
+            self.executor.shutdown()
+            self.start_workers()
+        self.pheromones[...] = self.maze.get_pher()
+        tasks = min(self.workers, count)
+        streams = rng.spawn(tasks)
+        futures = []
+        for task in range(tasks):
+            ants = count // tasks + (1 if task < count % tasks else 0)
+            futures.append(self.executor.submit(ParallelColony.walk, path_specification, ants, streams[task]))
+        routes = []
+        for future in futures:
+            routes.extend(future.result())
+        return routes
+
+    # Stop the workers and release the shared memory.
+    def close(self):
+        self.executor.shutdown()
+        self.pheromones = None
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Set up a worker process: build its private maze and attach to the shared pheromones.
+    # @param walls the walls of the maze
+    # @param width width of the maze
+    # @param length length of the maze
+    # @param memory_name name of the shared memory block with the pheromones
+    @staticmethod
+    def init_worker(walls, width, length, memory_name):
+        ParallelColony.worker_maze = Maze(walls, width, length)
+        ParallelColony.worker_memory = shared_memory.SharedMemory(name=memory_name)
+        ParallelColony.worker_pheromones = np.ndarray((width, length), dtype=np.float64,
+                                                      buffer=ParallelColony.worker_memory.buf)
+
+    # Task run by a worker: walk a number of ants on a copy of the shared pheromones.
+    # @param path_specification Specification of the route the ants walk
+    # @param count Number of ants
+    # @param rng RandomStream of this task
+    # @return list with the route of every ant
+    @staticmethod
+    def walk(path_specification, count, rng):
+        maze = ParallelColony.worker_maze
+        maze.get_pher()[...] = ParallelColony.worker_pheromones
+        routes = []
+        for ant in range(count):
+            routes.append(Ant(maze, path_specification, rng).find_route())
+        return routes
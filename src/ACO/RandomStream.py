@@ -0,0 +1,76 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+
+# Class holding the random generator of a solver.
+# A stream is made from a seed, and the same seed always gives the same numbers. Independent streams for worker
+# processes, tasks or islands are spawned from it, so every part of a run draws its own numbers no matter in
+# which order or in which process the parts run.
+# Loops that need a single number per step take it from a block drawn ahead with one numpy call, vectorized code
+# draws whole arrays from the numpy generator directly.
+class RandomStream:
+
+    # Number of values drawn ahead for random.
+    BLOCK_SIZE = 4096
+
+    # Stream used when a solver is not given one, made on first use in every process.
+    default_stream = None
+    default_process = None
+
+    # Constructs a new random stream.
+    # @param seed integer seed or numpy SeedSequence, None for a seed from the operating system.
+    def __init__(self, seed=None):
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self.generator = np.random.default_rng(seed)
+        self.block = []
+        self.index = 0
+
+    # Uniform random number in [0, 1), taken from the block drawn ahead.
+    # @return the number
+    def random(self):
+        if self.index >= len(self.block):
+            self.block = self.generator.random(RandomStream.BLOCK_SIZE).tolist()
+            self.index = 0
+        value = self.block[self.index]
+        self.index += 1
+        return value
+
+    # Uniform random number in [low, high).
+    # @param low lower bound
+    # @param high upper bound
+    # @return the number
+    def uniform(self, low, high):
+        return low + (high - low) * self.random()
+
+    # Array of uniform random numbers in [0, 1) drawn in one call.
+    # @param shape shape of the array
+    # @return float64 array
+    def random_block(self, shape):
+        return self.generator.random(shape)
+
+    # Array of random integers in [low, high) drawn in one call.
+    # @param low lower bound
+    # @param high upper bound (non-inclusive)
+    # @param shape shape of the array
+    # @return int64 array
+    def integers(self, low, high, shape):
+        return self.generator.integers(low, high, size=shape)
+
+    # Independent streams, for instance one per worker task. Every call gives new streams.
+    # @param count the number of streams
+    # @return list of streams
+    def spawn(self, count):
+        return [RandomStream(seed) for seed in self.seed_sequence.spawn(count)]
+
+    # The stream of solvers that were not given one.
+    # A forked process would inherit the stream of its parent and draw the same numbers, so it gets its own.
+    # @return the default stream of this process
+    @staticmethod
+    def get_default():
+        if RandomStream.default_process != os.getpid():
+            RandomStream.default_stream = RandomStream()
+            RandomStream.default_process = os.getpid()
+        return RandomStream.default_stream
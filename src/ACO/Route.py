@@ -1,38 +1,67 @@
 import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
+import numpy as np
+from src.Coordinate import Coordinate
 from src.Direction import Direction
 
 # Class representing a route.
+# The directions are held in a bytearray, one byte with Direction.dir_to_int per step, instead of a list of
+# Direction members.
 class Route:
 
+    # Direction of every byte value.
+    DIRECTIONS = tuple(Direction)
+
+    # Byte translation table that turns every direction into the opposite one.
+    OPPOSITES = bytes((value + 2) % 4 if value < 4 else value for value in range(256))
+
     # Route takes a starting coordinate to initialize
     # @param start starting coordinate
-    def __init__(self, start):
-        self.route = []
+    # @param directions optional bytes with the Direction.dir_to_int of every step
+    def __init__(self, start, directions=None):
+        self.directions = bytearray(directions) if directions is not None else bytearray()
         self.start = start
 
     # After taking a step we add the direction we moved in
     # @param dir Direction we moved in
     def add(self, dir):
-        self.route.append(dir)
+        self.directions.append(dir.value)
         return
 
     # Returns the length of the route
     # @return length of the route
     def size(self):
-        return len(self.route)
+        return len(self.directions)
 
     # Getter for the list of directions
     # @return list of directions
     def get_route(self):
-        return self.route
+        directions = Route.DIRECTIONS
+        return [directions[value] for value in self.directions]
+
+    # Getter for the directions as bytes, without making Direction members.
+    # @return bytearray with the Direction.dir_to_int of every step, shared with the route
+    def get_directions(self):
+        return self.directions
 
     # Getter for the starting coordinate
     # @return the starting coordinate
     def get_start(self):
         return self.start
 
+    # Coordinate the route ends at
+    # @return the end coordinate
+    def get_end(self):
+        directions = self.directions
+        return Coordinate(self.start.get_x() + directions.count(0) - directions.count(2),
+                          self.start.get_y() - directions.count(1) + directions.count(3))
+
+    # The same path walked the other way around, starting at the end of this route.
+    # @return the reversed route
+    def reverse(self):
+        return Route(self.get_end(), self.directions[::-1].translate(Route.OPPOSITES))
+
     # Function that checks whether a route is smaller than another route
     # @param other the other route
     # @return whether the route is shorter
@@ -42,23 +71,25 @@ class Route:
     # Take a step back in the route and return the last direction
     # @return last direction
     def remove_last(self):
-        return self.route.pop()
+        return Route.DIRECTIONS[self.directions.pop()]
 
     # Build a string representing the route as the format specified in the manual.
     # @return string with the specified format of a route
     def __str__(self):
-        string = ""
-        for dir in self.route:
-            string += str(Direction.dir_to_int(dir))
-            string += ";\n"
-        return string
+        return "".join(str(value) + ";\n" for value in self.directions)
 
     # Equals method for route
     # @param other Other route
     # @return boolean whether they are equal
     def __eq__(self, other):
-        return self.start == other.start and self.route == other.route
+        return self.start == other.start and self.directions == other.directions
+
 
+    # Routes pickled before the directions were bytes carry a list of Direction members.
+    def __setstate__(self, state):
+        if "route" in state:
+            state["directions"] = bytearray(dir.value for dir in state.pop("route"))
+        self.__dict__.update(state)
 
     # Method that implements the specified format for writing a route to a file.
     # @param filePath path to route file.
@@ -66,9 +97,38 @@ class Route:
     def write_to_file(self, file_path):
         f = open(file_path, "w")
         string = ""
-        string += str(len(self.route))
+        string += str(len(self.directions))
         string += ";\n"
         string += str(self.start)
         string += ";\n"
         string += str(self)
-        f.write(string)
\ No newline at end of file
+        f.write(string)
+
+    # Pack the directions of many routes into one stream of 2 bits per step, four steps per byte.
+    # @param routes list of routes
+    # @return tuple of the int64 offsets of every route in the stream (one more than there are routes)
+    #         and the uint8 packed stream
+    @staticmethod
+    def pack_routes(routes):
+        offsets = np.zeros(len(routes) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([route.size() for route in routes])
+        steps = int(offsets[-1])
+        values = np.zeros(-(-steps // 4) * 4, dtype=np.uint8)
+        values[:steps] = np.frombuffer(b"".join(route.get_directions() for route in routes), dtype=np.uint8)
+        quads = values.reshape(-1, 4)
+        packed = quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+        return offsets, packed
+
+    # Unpack routes packed by pack_routes.
+    # @param starts list with the start coordinate of every route
+    # @param offsets offsets of every route in the stream
+    # @param packed the packed stream
+    # @return list of routes
+    @staticmethod
+    def unpack_routes(starts, offsets, packed):
+        packed = np.asarray(packed, dtype=np.uint8)
+        values = np.empty((len(packed), 4), dtype=np.uint8)
+        for i in range(4):
+            values[:, i] = (packed >> (2 * i)) & 3
+        values = values.ravel()
+        return [Route(starts[i], values[offsets[i]:offsets[i + 1]].tobytes()) for i in range(len(starts))]
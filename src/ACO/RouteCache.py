@@ -0,0 +1,113 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import hashlib
+from collections import OrderedDict
+from src.Route import Route
+
+# Class that remembers routes that were found before.
+# Routes are addressed by a hash of the maze walls, the start and end coordinates and the solver parameters,
+# so a cached route is only reused for exactly the same question. Recently used routes are kept in memory up to
+# a maximum number of bytes, least recently used routes are evicted first. With a directory every route is also
+# written to disk, so later runs over the same maze layout can reuse it.
+class RouteCache:
+
+    # Estimated memory used by a cache entry next to its directions.
+    ENTRY_OVERHEAD = 200
+
+    # Constructs a new route cache.
+    # @param directory directory for the routes on disk, None to only cache in memory.
+    # @param max_bytes maximum estimated size of the routes kept in memory.
+    def __init__(self, directory=None, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # Cache key of a route question.
+    # @param maze the maze the route is in
+    # @param start start coordinate
+    # @param end end coordinate
+    # @param parameters tuple describing the solver and its parameters
+    # @return hexadecimal key
+    @staticmethod
+    def make_key(maze, start, end, parameters):
+        key = hashlib.sha256(maze.get_hash().encode())
+        key.update((str(start) + ";" + str(end) + ";" + repr(parameters)).encode())
+        return key.hexdigest()
+
+    # Look up a route.
+    # @param key the cache key
+    # @param start start coordinate of the route
+    # @return the cached route, or None when the route is not cached
+    def get(self, key, start):
+        data = self.memory.get(key)
+        if data is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return RouteCache.decode(data, start)
+        if self.directory is not None and os.path.exists(self.get_path(key)):
+            with open(self.get_path(key), "rb") as f:
+                data = f.read()
+            self.store(key, data)
+            self.hits += 1
+            self.disk_hits += 1
+            return RouteCache.decode(data, start)
+        self.misses += 1
+        return None
+
+    # Add a route to the cache.
+    # @param key the cache key
+    # @param route the route
+    def put(self, key, route):
+        data = RouteCache.encode(route)
+        self.store(key, data)
+        if self.directory is not None:
+            temporary = self.get_path(key) + ".tmp"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, self.get_path(key))
+
+    # Keep the directions of a route in memory, evicting the least recently used routes when full.
+    # @param key the cache key
+    # @param data the encoded directions
+    def store(self, key, data):
+        if key in self.memory:
+            self.memory_bytes -= len(self.memory.pop(key)) + RouteCache.ENTRY_OVERHEAD
+        self.memory[key] = data
+        self.memory_bytes += len(data) + RouteCache.ENTRY_OVERHEAD
+        while self.memory_bytes > self.max_bytes and len(self.memory) > 0:
+            key, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted) + RouteCache.ENTRY_OVERHEAD
+
+    # Path of the file of a route on disk.
+    # @param key the cache key
+    # @return the file path
+    def get_path(self, key):
+        return os.path.join(self.directory, key + ".route")
+
+    # Hit and miss counters of the cache.
+    # @return dictionary with the counters and the size of the memory cache
+    def get_statistics(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "entries": len(self.memory), "bytes": self.memory_bytes}
+
+    # Directions of a route as bytes, one byte per step.
+    # @param route the route
+    # @return the encoded directions
+    @staticmethod
+    def encode(route):
+        return bytes(route.get_directions())
+
+    # Route from encoded directions.
+    # @param data the encoded directions
+    # @param start start coordinate of the route
+    # @return the route
+    @staticmethod
+    def decode(data, start):
+        return Route(start, data)
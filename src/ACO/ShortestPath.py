@@ -0,0 +1,151 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import heapq
+import numpy as np
+from src.Route import Route
+
+# Class that finds exact shortest routes in a maze.
+# The maze is an unweighted grid where every step costs the same, so breadth first search and A* find
+# optimal routes directly. The routes can be used as a fast replacement of the ants, as a reference to
+# measure the quality of the routes the ants find, or to seed the pheromones of an ant colony.
+class ShortestPath:
+
+    # Constructs a new exact solver for a maze.
+    # @param maze the maze.
+    def __init__(self, maze):
+        self.maze = maze
+        # find_shortest_routes finds the routes to many targets with a single search
+        self.shares_runs = True
+        self.layout = None
+        self.cell_x = None
+        self.cell_y = None
+
+    # Plain python copies of the cell coordinates of the maze, made again when its walls have changed.
+    # @return tuple of the x and the y coordinate list indexed by cell id
+    def get_cell_coordinates(self):
+        if self.layout != self.maze.get_hash():
+            self.cell_x = self.maze.cell_x.tolist()
+            self.cell_y = self.maze.cell_y.tolist()
+            self.layout = self.maze.get_hash()
+        return self.cell_x, self.cell_y
+
+    # Find the shortest route between two coordinates with A* and the manhattan distance as heuristic.
+    # @param path_specification Specification of the route to find
+    # @return the shortest route, an empty route if the end can not be reached
+    def find_shortest_route(self, path_specification):
+        start_coordinate = path_specification.get_start()
+        if start_coordinate == path_specification.get_end():
+            return Route(start_coordinate)
+        start = self.maze.get_cell(start_coordinate)
+        end = self.maze.get_cell(path_specification.get_end())
+        if start < 0 or end < 0:
+            print("No route between " + str(path_specification))
+            return Route(start_coordinate)
+
+        neighbours = self.maze.get_neighbour_lists()[0]
+        cell_x, cell_y = self.get_cell_coordinates()
+        end_x = cell_x[end]
+        end_y = cell_y[end]
+        steps = {start: 0}
+        parents = {start: -1}
+        heap = [(abs(cell_x[start] - end_x) + abs(cell_y[start] - end_y), 0, start)]
+        while len(heap) > 0:
+            estimate, distance, cell = heapq.heappop(heap)
+            if cell == end:
+                break
+            if distance > steps[cell]:
+                continue
+            for neighbour in neighbours[cell]:
+                if neighbour < 0 or steps.get(neighbour, distance + 2) <= distance + 1:
+                    continue
+                steps[neighbour] = distance + 1
+                parents[neighbour] = cell
+                estimate = distance + 1 + abs(cell_x[neighbour] - end_x) + abs(cell_y[neighbour] - end_y)
+                heapq.heappush(heap, (estimate, distance + 1, neighbour))
+
+        if end not in parents:
+            print("No route between " + str(path_specification))
+            return Route(start_coordinate)
+        path = [end]
+        while parents[path[-1]] >= 0:
+            path.append(parents[path[-1]])
+        path.reverse()
+        return self.maze.create_route(path)
+
+    # Breadth first search from a single source over the whole maze.
+    # Every round expands the whole frontier at once through the neighbour table of the maze.
+    # @param source Coordinate to measure the distances from
+    # @return tuple of two arrays indexed by cell id: the number of steps from the source (-1 if unreachable)
+    #         and the previous cell on a shortest route from the source (-1 for the source and unreachable cells)
+    def distance_field(self, source):
+        maze = self.maze
+        distances = np.full(maze.cell_count, -1, dtype=np.int64)
+        parents = np.full(maze.cell_count, -1, dtype=np.int32)
+        start = maze.get_cell(source)
+        if start < 0:
+            return distances, parents
+        distances[start] = 0
+        frontier = np.array([start], dtype=np.int32)
+        step = 0
+        while len(frontier) > 0:
+            step += 1
+            around = maze.neighbours[frontier].ravel()
+            origin = np.repeat(frontier, 4)
+            fresh = around >= 0
+            around = around[fresh]
+            origin = origin[fresh]
+            fresh = distances[around] < 0
+            around, first = np.unique(around[fresh], return_index=True)
+            distances[around] = step
+            parents[around] = origin[fresh][first]
+            frontier = around
+        return distances, parents
+
+    # Find the shortest routes from one source to many targets with a single breadth first search.
+    # @param source Start coordinate of all the routes
+    # @param targets List of end coordinates
+    # @return list with the shortest route to every target, empty routes for targets that can not be reached
+    def find_shortest_routes(self, source, targets):
+        distances, parents = self.distance_field(source)
+        parents = parents.tolist()
+        routes = []
+        for target in targets:
+            cell = self.maze.get_cell(target)
+            if target == source or cell < 0 or distances[cell] < 0:
+                routes.append(Route(source))
+                continue
+            path = [cell]
+            while parents[path[-1]] >= 0:
+                path.append(parents[path[-1]])
+            path.reverse()
+            routes.append(self.maze.create_route(path))
+        return routes
+
+    # Length of the shortest route.
+    # @param path_specification Specification of the route
+    # @return number of steps of the shortest route, -1 if the end can not be reached
+    def get_distance(self, path_specification):
+        distances, parents = self.distance_field(path_specification.get_start())
+        end = self.maze.get_cell(path_specification.get_end())
+        if end < 0:
+            return -1
+        return int(distances[end])
+
+    # Quality of a route compared to the shortest route with the same start and end.
+    # @param route The route to rate
+    # @param path_specification Specification the route was found for
+    # @return ratio of the route length to the optimal length, 1.0 is optimal
+    def route_quality(self, route, path_specification):
+        optimal = self.get_distance(path_specification)
+        if optimal <= 0:
+            return 1.0 if route.size() == 0 else float("inf")
+        return route.size() / optimal
+
+    # Seed the pheromones of the maze with the shortest route, as if one ant had walked it.
+    # @param path_specification Specification of the route
+    # @param q Normalization factor for the amount of dropped pheromone
+    def seed_pheromones(self, path_specification, q):
+        route = self.find_shortest_route(path_specification)
+        if route.size() > 0:
+            self.maze.add_pheromone_route(route, q)
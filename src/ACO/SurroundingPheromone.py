@@ -2,7 +2,7 @@ import os, sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
 from src.Direction import Direction
-from random import uniform
+from src.RandomStream import RandomStream
 from math import floor
 
 # Class containing the pheromone information around a certain point in the maze
@@ -61,7 +61,7 @@ class SurroundingPheromone:
             highest_dir.append(dir)
         return highest, highest_dir
 
-    def get_highest_pheromone(self):
+    def get_highest_pheromone(self, rng=None):
         highest = self.north
         highest_dir = [Direction.north]
         highest, highest_dir = self.append_set(Direction.east, self.east, highest, highest_dir)
@@ -70,7 +70,9 @@ class SurroundingPheromone:
         if len(highest_dir) == 1:
             return highest_dir[0]
         else:
-            random_value = (int(floor(uniform(0, len(highest_dir)))))
+            if rng is None:
+                rng = RandomStream.get_default()
+            random_value = (int(floor(rng.uniform(0, len(highest_dir)))))
             if random_value == len(highest_dir):
                 return highest_dir[random_value - 1]
             return highest_dir[random_value]
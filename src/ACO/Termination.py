@@ -0,0 +1,65 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import time
+
+# Class that decides when an iterative solver should stop.
+# A solver calls start before its first iteration, asks should_stop before every iteration and reports the best
+# value found so far (lower is better) with update after every iteration. Any combination of the criteria can be
+# used, the solver stops as soon as one of them is met:
+# an iteration cap, a wall-clock time limit, a stagnation window of iterations without improvement and a target
+# value that is good enough.
+class Termination:
+
+    # Constructs a new termination criterion.
+    # @param max_iterations the maximum number of iterations, None for no cap.
+    # @param time_limit the maximum number of seconds, None for no deadline.
+    # @param stagnation the number of iterations without improvement after which to stop, None to never stop.
+    # @param target the value at or below which to stop, None for no target.
+    # @param tolerance the amount a value has to improve on the best value to count as an improvement.
+    def __init__(self, max_iterations=None, time_limit=None, stagnation=None, target=None, tolerance=0):
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit
+        self.stagnation = stagnation
+        self.target = target
+        self.tolerance = tolerance
+        self.start()
+
+    # Start counting iterations and time for a new run.
+    def start(self):
+        self.start_time = time.monotonic()
+        self.iterations = 0
+        self.best = None
+        self.last_improvement = 0
+        self.reason = None
+
+    # Report the end of an iteration.
+    # @param value the best value found so far, None if there is no solution yet.
+    def update(self, value):
+        self.iterations += 1
+        if value is None:
+            return
+        if self.best is None or value < self.best - self.tolerance:
+            self.last_improvement = self.iterations
+        if self.best is None or value < self.best:
+            self.best = value
+
+    # Whether the solver should stop before the next iteration. The criterion that was met is kept in reason.
+    # @return true if any criterion is met
+    def should_stop(self):
+        if self.max_iterations is not None and self.iterations >= self.max_iterations:
+            self.reason = "iterations"
+        elif self.time_limit is not None and self.get_elapsed() >= self.time_limit:
+            self.reason = "time limit"
+        elif self.target is not None and self.best is not None and self.best <= self.target:
+            self.reason = "target"
+        elif self.stagnation is not None and self.iterations - self.last_improvement >= self.stagnation:
+            self.reason = "stagnation"
+        else:
+            return False
+        return True
+
+    # Seconds since the start of the run.
+    # @return elapsed wall-clock time
+    def get_elapsed(self):
+        return time.monotonic() - self.start_time
@@ -0,0 +1,158 @@
+import os, sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import time
+import numpy as np
+from src.GeneticAlgorithm import GeneticAlgorithm
+from src.RandomStream import RandomStream
+from src.Termination import Termination
+from src.TSPData import TSPData
+
+
+# TSP problem solver using an Ant Colony System.
+# The ants walk over the product distances of TSPData, from the start along all products, and the tour ends at the
+# end location. Pheromone and heuristic are held as matrices from the start and every product to every product.
+# All ants of an iteration build their tours together, one product per step for every ant at once. An ant picks
+# the best product by pheromone and heuristic with probability q0 and otherwise a random one in proportion to it,
+# only looking at the nearest products of its location while any of those are left. Ants wear off the pheromone
+# of the edges they take, and after every iteration only the edges of the best tour so far are reinforced.
+class AntColonySystem:
+
+    # Constructs a new 'ant colony system' object.
+    # @param iterations the amount of iterations.
+    # @param ants the amount of ants per iteration.
+    # @param beta the weight of the heuristic (inverse distance) against the pheromone.
+    # @param rho the evaporation factor of the global pheromone update.
+    # @param xi the evaporation factor of the local pheromone update.
+    # @param q0 the probability that an ant takes the best product instead of a random one.
+    # @param candidates the number of nearest products an ant looks at first.
+    # @param termination optional Termination deciding when solve_tsp stops, by default it stops after the given
+    # amount of iterations.
+    # @param seed seed of the RandomStream the ants draw from, None for a random seed.
+    def __init__(self, iterations, ants, beta=2.0, rho=0.1, xi=0.1, q0=0.9, candidates=10, termination=None,
+                 seed=None):
+        self.iterations = iterations
+        self.ants = ants
+        self.beta = beta
+        self.rho = rho
+        self.xi = xi
+        self.q0 = q0
+        self.candidates = candidates
+        self.termination = termination
+        self.rng = RandomStream(seed)
+
+    # Tour lengths of many product orders at once, counted like GeneticAlgorithm.
+    # @param cost the cost matrix of TSPData.
+    # @param tours 2-D integer array with a product order per row.
+    # @return array with the number of steps of every tour, including a step per product taken.
+    def get_tour_lengths(self, cost, tours):
+        start = cost.shape[0] - 2
+        steps = cost[start, tours[:, 0]] + cost[tours[:, -1], start + 1]
+        steps += cost[tours[:, :-1], tours[:, 1:]].sum(axis=1)
+        return steps + tours.shape[1]
+
+    # Tour built by always going to the nearest product that is left, used to scale the initial pheromone.
+    # @param cost the cost matrix of TSPData.
+    # @return the nearest neighbour product order.
+    def nearest_neighbour_tour(self, cost):
+        number_of_products = cost.shape[0] - 2
+        left = np.ones(number_of_products, dtype=bool)
+        current = number_of_products
+        tour = []
+        for step in range(number_of_products):
+            distances = np.where(left, cost[current, :number_of_products], np.iinfo(np.int64).max)
+            current = int(np.argmin(distances))
+            left[current] = False
+            tour.append(current)
+        return tour
+
+    # Build the tours of all ants of an iteration.
+    # @param pheromone pheromone from the start and every product to every product, locally updated in place.
+    # @param attraction heuristic to the power beta, same shape as the pheromone.
+    # @param candidate_mask whether a product is one of the nearest products of a location.
+    # @param tau0 the initial pheromone.
+    # @return 2-D integer array with the tour of every ant.
+    def construct_tours(self, pheromone, attraction, candidate_mask, tau0):
+        number_of_products = pheromone.shape[1]
+        ants = np.arange(self.ants)
+        current = np.full(self.ants, number_of_products, dtype=np.intp)
+        visited = np.zeros((self.ants, number_of_products), dtype=bool)
+        tours = np.empty((self.ants, number_of_products), dtype=np.intp)
+        for step in range(number_of_products):
+            weights = pheromone[current] * attraction[current]
+            weights[visited] = 0
+            near = weights * candidate_mask[current]
+            use_near = near.sum(axis=1) > 0
+            weights[use_near] = near[use_near]
+
+            # exploitation takes the best product, exploration draws one in proportion to the weights
+            draws = self.rng.random_block((2, self.ants))
+            cumulative = np.cumsum(weights, axis=1)
+            explore = np.minimum((cumulative <= (draws[1] * cumulative[:, -1])[:, None]).sum(axis=1),
+                                 number_of_products - 1)
+            chosen = np.where(draws[0] < self.q0, np.argmax(weights, axis=1), explore)
+
+            pheromone[current, chosen] = (1 - self.xi) * pheromone[current, chosen] + self.xi * tau0
+            visited[ants, chosen] = True
+            tours[:, step] = chosen
+            current = chosen
+        return tours
+
+    # This method should solve the TSP.
+    # @param tsp_data the TSP data.
+    # @return the optimized product sequence.
+    def solve_tsp(self, tsp_data):
+        cost = tsp_data.get_cost_matrix()
+        number_of_products = cost.shape[0] - 2
+        if number_of_products < 2:
+            return list(range(number_of_products))
+
+        # rows are the start and the products, columns the products
+        distances = cost[:number_of_products + 1, :number_of_products].astype(np.float64)
+        attraction = (1.0 / np.maximum(distances, 1.0)) ** self.beta
+        attraction[np.arange(number_of_products), np.arange(number_of_products)] = 0
+        own = np.eye(number_of_products + 1, number_of_products, dtype=bool)
+        nearest = np.argsort(np.where(own, np.inf, distances), axis=1,
+                             kind="stable")[:, :min(self.candidates, number_of_products)]
+        candidate_mask = np.zeros((number_of_products + 1, number_of_products), dtype=bool)
+        candidate_mask[np.arange(number_of_products + 1)[:, None], nearest] = True
+
+        best_tour = np.array(self.nearest_neighbour_tour(cost))
+        best_length = self.get_tour_lengths(cost, best_tour[None, :])[0]
+        tau0 = 1.0 / (number_of_products * best_length)
+        pheromone = np.full((number_of_products + 1, number_of_products), tau0)
+
+        termination = self.termination
+        if termination is None:
+            termination = Termination(max_iterations=self.iterations)
+        termination.start()
+        iteration = 0
+        while not termination.should_stop():
+            tours = self.construct_tours(pheromone, attraction, candidate_mask, tau0)
+            lengths = self.get_tour_lengths(cost, tours)
+            fittest = int(np.argmin(lengths))
+            if lengths[fittest] < best_length:
+                best_length = lengths[fittest]
+                best_tour = tours[fittest].copy()
+
+            # global update along the best tour so far, starting from the start
+            origins = np.concatenate([[number_of_products], best_tour[:-1]])
+            pheromone[origins, best_tour] = (1 - self.rho) * pheromone[origins, best_tour] + self.rho / best_length
+            print("iteration", str(iteration), "shortest:", str(best_length))
+            termination.update(int(best_length))
+            iteration += 1
+
+        return best_tour.tolist()
+
+
+# Compare the ant colony system with the genetic algorithm on the same TSP data.
+if __name__ == "__main__":
+    persist_file = "./../data/productMatrixDist"
+    tsp_data = TSPData.read_from_file(persist_file, load_routes=False)
+    solvers = [("ant colony system", AntColonySystem(100, 20)), ("genetic algorithm", GeneticAlgorithm(100, 20))]
+    for name, solver in solvers:
+        start_time = time.time()
+        solution = solver.solve_tsp(tsp_data)
+        length = tsp_data.get_tour_length(solution)
+        print(name + ": length " + str(length) + ", time taken " + str(round(time.time() - start_time, 3)))
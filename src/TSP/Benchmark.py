@@ -0,0 +1,296 @@
+import os, sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import time
+import numpy as np
+from src.AntColonyOptimization import AntColonyOptimization
+from src.AntColonySystem import AntColonySystem
+from src.CorridorColonyOptimization import CorridorColonyOptimization
+from src.GeneticAlgorithm import GeneticAlgorithm
+from src.LocalSearch import LocalSearch
+from src.Maze import Maze
+from src.MazeGenerator import MazeGenerator
+from src.PathSpecification import PathSpecification
+from src.ShortestPath import ShortestPath
+from src.Termination import Termination
+from src.TSPData import TSPData
+
+
+# Benchmark of the route and TSP solvers on a fixed set of mazes and TSP instances.
+# The mazes are the assignment mazes in the data directory, when they are there, and mazes of increasing size
+# made by MazeGenerator. Every route solver runs on every maze and is compared with the exact shortest route.
+# The TSP instances are the assignment products on the hard maze and generated instances, their distances are
+# calculated exactly once and every TSP solver runs on them.
+# Every run records its wall time, its throughput, the generations it ran and the generation of its last
+# improvement, and the quality of its result. All solvers are seeded, so two runs of the same code give the same
+# results apart from the times. The results are written as JSON, and compare checks a run against a baseline
+# run, for instance of an earlier commit.
+class Benchmark:
+
+    # Maze fixtures in the data directory, read from "<name> maze.txt" and "<name> coordinates.txt".
+    MAZES = ("easy", "medium", "hard", "insane")
+
+    # Layouts and sizes of the generated square mazes.
+    SYNTHETIC_MAZES = (("braided", 51), ("braided", 101), ("braided", 201), ("braided", 401), ("warehouse", 101))
+
+    # Layouts, sizes and product counts of the generated TSP instances.
+    SYNTHETIC_TSP = (("braided", 101, 30), ("warehouse", 101, 30))
+
+    # Route solvers that can be benchmarked.
+    ROUTE_SOLVERS = ("aco-serial", "aco-batch", "aco-parallel", "corridor")
+
+    # TSP solvers that can be benchmarked.
+    TSP_SOLVERS = ("ga", "ga-local-search", "acs")
+
+    # Metrics where a higher value is worse, they are checked for regressions.
+    REGRESSION_METRICS = ("time", "quality")
+
+    # Metrics checked for regressions of the TSP runs. Their quality is relative to the best tour of the same run,
+    # so it does not change when all solvers get worse together, their tour length does.
+    TSP_REGRESSION_METRICS = ("time", "quality", "length")
+
+    # Time differences below this many seconds are timer noise and never count as a regression.
+    MINIMUM_TIME_DIFFERENCE = 0.05
+
+    # Constructs a new benchmark.
+    # @param data_directory directory with the maze, coordinate and product files.
+    # @param seed seed of all solvers and generated instances.
+    # @param route_solvers the route solvers to run, a subset of ROUTE_SOLVERS.
+    # @param tsp_solvers the TSP solvers to run, a subset of TSP_SOLVERS.
+    # @param generations the generations of the ant colonies.
+    # @param tsp_generations the generations of the TSP solvers.
+    def __init__(self, data_directory="./../data", seed=0, route_solvers=("aco-serial", "aco-batch", "corridor"),
+                 tsp_solvers=TSP_SOLVERS, generations=20, tsp_generations=200):
+        for solver in route_solvers:
+            if solver not in Benchmark.ROUTE_SOLVERS:
+                raise ValueError("Unknown route solver " + str(solver))
+        for solver in tsp_solvers:
+            if solver not in Benchmark.TSP_SOLVERS:
+                raise ValueError("Unknown TSP solver " + str(solver))
+        self.data_directory = data_directory
+        self.seed = seed
+        self.route_solvers = route_solvers
+        self.tsp_solvers = tsp_solvers
+        self.generations = generations
+        self.tsp_generations = tsp_generations
+        self.ants_per_gen = 10
+        self.q = 1000
+        self.evaporation = 0.1
+        self.population_size = 50
+        self.results = []
+
+    # Run all benchmarks.
+    # @return list with a dictionary of metrics per run
+    def run(self):
+        self.run_maze_benchmarks()
+        self.run_tsp_benchmarks()
+        return self.results
+
+    # Mazes of the benchmark, the fixtures that are in the data directory and the generated mazes.
+    # @return list of tuples (name, maze, path specification)
+    def get_mazes(self):
+        mazes = []
+        for name in Benchmark.MAZES:
+            maze_file = os.path.join(self.data_directory, name + " maze.txt")
+            coordinates = os.path.join(self.data_directory, name + " coordinates.txt")
+            if not os.path.exists(maze_file) or not os.path.exists(coordinates):
+                print("Skipping maze " + name + ", no files in " + self.data_directory)
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                maze = Maze.create_maze(maze_file)
+            mazes.append((name, maze, PathSpecification.read_coordinates(coordinates)))
+        for layout, size in Benchmark.SYNTHETIC_MAZES:
+            generator = MazeGenerator(size, size, layout, seed=self.seed)
+            mazes.append((layout + "-" + str(size), generator.generate_maze(), generator.get_specification()))
+        return mazes
+
+    # Run every route solver on every maze.
+    def run_maze_benchmarks(self):
+        for name, maze, spec in self.get_mazes():
+            exact = ShortestPath(maze)
+            start = time.perf_counter()
+            optimum = exact.find_shortest_route(spec).size()
+            self.add_result("maze/" + name + "/exact", time.perf_counter() - start, length=optimum, quality=1.0)
+            for solver_name in self.route_solvers:
+                termination = Termination(max_iterations=self.generations)
+                solver = self.make_route_solver(solver_name, maze, spec, termination)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    route = solver.find_shortest_route(spec)
+                    elapsed = time.perf_counter() - start
+                    if hasattr(solver, "close"):
+                        solver.close()
+                found = route.size() > 0 or spec.get_start() == spec.get_end()
+                self.add_result("maze/" + name + "/" + solver_name, elapsed,
+                                steps_per_second=solver.route_steps / elapsed if elapsed > 0 else None,
+                                generations=termination.iterations, convergence=termination.last_improvement,
+                                length=route.size() if found else None,
+                                quality=route.size() / optimum if found and optimum > 0 else None)
+                print(self.format_result(self.results[-1]))
+
+    # Make a route solver.
+    # @param solver_name one of ROUTE_SOLVERS
+    # @param maze the maze
+    # @param spec the path specification
+    # @param termination the termination of the solver
+    # @return the solver
+    def make_route_solver(self, solver_name, maze, spec, termination):
+        if solver_name == "corridor":
+            with contextlib.redirect_stdout(io.StringIO()):
+                return CorridorColonyOptimization(maze, self.ants_per_gen, self.generations, self.q, self.evaporation,
+                                                  [spec.get_start(), spec.get_end()], termination, self.seed)
+        mode = solver_name[len("aco-"):]
+        return AntColonyOptimization(maze, self.ants_per_gen, self.generations, self.q, self.evaporation, mode,
+                                     seed=self.seed, termination=termination)
+
+    # TSP instances of the benchmark, the fixture when it is in the data directory and a generated instance.
+    # @return list of tuples (name, TSP data with calculated routes)
+    def get_tsp_instances(self):
+        instances = []
+        maze_file = os.path.join(self.data_directory, "hard maze.txt")
+        coordinates = os.path.join(self.data_directory, "hard coordinates.txt")
+        products = os.path.join(self.data_directory, "tsp products.txt")
+        if all(os.path.exists(path) for path in (maze_file, coordinates, products)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                maze = Maze.create_maze(maze_file)
+            instances.append(("hard", maze, TSPData.read_specification(coordinates, products)))
+        else:
+            print("Skipping TSP fixture, no files in " + self.data_directory)
+        for layout, size, products in Benchmark.SYNTHETIC_TSP:
+            generator = MazeGenerator(size, size, layout, seed=self.seed)
+            tsp_data = TSPData(generator.get_product_locations(products), generator.get_specification())
+            instances.append((layout + "-" + str(size), generator.generate_maze(), tsp_data))
+
+        calculated = []
+        for name, maze, tsp_data in instances:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                tsp_data.calculate_routes(ShortestPath(maze), symmetric=True)
+                elapsed = time.perf_counter() - start
+            routes = len(tsp_data.route_keys(True))
+            self.add_result("tsp/" + name + "/routes-exact", elapsed,
+                            steps_per_second=routes / elapsed if elapsed > 0 else None)
+            calculated.append((name, tsp_data))
+        return calculated
+
+    # Run every TSP solver on every TSP instance.
+    # The quality of a tour is its length compared to the shortest tour any solver found for the instance.
+    def run_tsp_benchmarks(self):
+        for name, tsp_data in self.get_tsp_instances():
+            first = len(self.results)
+            for solver_name in self.tsp_solvers:
+                termination = Termination(max_iterations=self.tsp_generations)
+                if solver_name == "acs":
+                    solver = AntColonySystem(self.tsp_generations, self.ants_per_gen, termination=termination,
+                                             seed=self.seed)
+                    tours = self.ants_per_gen
+                else:
+                    local_search = LocalSearch(tsp_data) if solver_name == "ga-local-search" else None
+                    solver = GeneticAlgorithm(self.tsp_generations, self.population_size, local_search=local_search,
+                                              termination=termination, seed=self.seed)
+                    tours = self.population_size
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    tour = solver.solve_tsp(tsp_data)
+                    elapsed = time.perf_counter() - start
+                self.add_result("tsp/" + name + "/" + solver_name, elapsed,
+                                tours_per_second=termination.iterations * tours / elapsed if elapsed > 0 else None,
+                                generations=termination.iterations, convergence=termination.last_improvement,
+                                length=tsp_data.get_tour_length(tour))
+            best = min(result["length"] for result in self.results[first:])
+            for result in self.results[first:]:
+                result["quality"] = result["length"] / best
+                print(self.format_result(result))
+
+    # Record the metrics of a run.
+    # @param name name of the run, made of the kind of benchmark, the instance and the solver
+    # @param elapsed the wall time in seconds
+    # @param metrics further metrics, None for metrics that do not apply
+    def add_result(self, name, elapsed, **metrics):
+        result = {"name": name, "time": elapsed}
+        for metric, value in metrics.items():
+            if value is not None:
+                result[metric] = float(value) if isinstance(value, float) else value
+        self.results.append(result)
+
+    # One line summary of a result.
+    # @param result dictionary of metrics
+    # @return the summary
+    def format_result(self, result):
+        parts = [result["name"], "time " + str(round(result["time"], 3))]
+        for metric in ("steps_per_second", "tours_per_second", "generations", "convergence", "length", "quality"):
+            if metric in result:
+                value = result[metric]
+                parts.append(metric + " " + str(round(value, 3) if isinstance(value, float) else value))
+        return ", ".join(parts)
+
+    # Write the results with the commit and the versions they were measured with.
+    # @param file_path path of the JSON file
+    def write_results(self, file_path):
+        report = {"commit": Benchmark.get_commit(), "python": platform.python_version(), "numpy": np.__version__,
+                  "seed": self.seed, "results": self.results}
+        with open(file_path, "w") as f:
+            json.dump(report, f, indent=1)
+
+    # The git commit of the working directory.
+    # @return the commit hash, None outside of a git repository
+    @staticmethod
+    def get_commit():
+        try:
+            output = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.realpath(__file__)))
+        except OSError:
+            return None
+        return output.stdout.strip() if output.returncode == 0 else None
+
+    # Compare results with the results of a baseline run.
+    # A run regresses when a metric of REGRESSION_METRICS, or TSP_REGRESSION_METRICS for the TSP runs, grows by
+    # more than the threshold compared to the baseline, for the time also by more than MINIMUM_TIME_DIFFERENCE.
+    # @param baseline_path path of the JSON file of the baseline
+    # @param current_path path of the JSON file to check
+    # @param threshold the allowed relative growth, 0.1 allows 10 percent
+    # @return list of tuples (name, metric, baseline value, current value) of the regressions
+    @staticmethod
+    def compare(baseline_path, current_path, threshold=0.1):
+        with open(baseline_path) as f:
+            baseline = {result["name"]: result for result in json.load(f)["results"]}
+        with open(current_path) as f:
+            current = json.load(f)["results"]
+        regressions = []
+        for result in current:
+            before = baseline.get(result["name"])
+            if before is None:
+                continue
+            metrics = Benchmark.TSP_REGRESSION_METRICS if result["name"].startswith("tsp/") \
+                else Benchmark.REGRESSION_METRICS
+            for metric in metrics:
+                if metric not in result or metric not in before:
+                    continue
+                if metric == "time" and result[metric] - before[metric] < Benchmark.MINIMUM_TIME_DIFFERENCE:
+                    continue
+                if result[metric] > before[metric] * (1 + threshold):
+                    regressions.append((result["name"], metric, before[metric], result[metric]))
+        for name, metric, before, after in regressions:
+            print("Regression in " + name + ": " + metric + " " + str(round(before, 4)) + " -> "
+                  + str(round(after, 4)))
+        print(str(len(regressions)) + " regressions against " + baseline_path)
+        return regressions
+
+
+# Run the benchmark and write the results, optionally checking them against a baseline.
+# Usage: Benchmark.py [results file] [baseline file] [threshold]
+if __name__ == "__main__":
+    results_file = sys.argv[1] if len(sys.argv) > 1 else "./../data/benchmark.json"
+    benchmark = Benchmark()
+    benchmark.run()
+    benchmark.write_results(results_file)
+    if len(sys.argv) > 2:
+        threshold = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+        if len(Benchmark.compare(sys.argv[2], results_file, threshold)) > 0:
+            sys.exit(1)
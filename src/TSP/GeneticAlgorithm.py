@@ -2,183 +2,254 @@ import os, sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
-import random
 import numpy as np
+from src.RandomStream import RandomStream
+from src.Termination import Termination
 from src.TSPData import TSPData
 
 
 # TSP problem solver using genetic algorithms.
 class GeneticAlgorithm:
 
+    # Crossover operators that can be used.
+    # ox is order crossover, pmx is partially mapped crossover.
+    CROSSOVERS = ("ox", "pmx")
+
     # Constructs a new 'genetic algorithm' object.
     # @param generations the amount of generations.
     # @param popSize the population size.
-    def __init__(self, generations, pop_size):
+    # @param pc the probability that a pair of parents is crossed over instead of copied.
+    # @param pm the probability that an offspring chromosome is mutated.
+    # @param crossover_operator the crossover operator, one of CROSSOVERS.
+    # @param tournament_size the number of chromosomes competing in a selection tournament.
+    # @param local_search optional LocalSearch, the fittest offspring of every generation is improved with it.
+    # @param termination optional Termination deciding when solve_tsp stops, by default it stops after the given
+    # amount of generations.
+    # @param seed seed of the RandomStream of the algorithm, None for a random seed.
+    def __init__(self, generations, pop_size, pc=0.7, pm=0.1, crossover_operator="ox", tournament_size=2,
+                 local_search=None, termination=None, seed=None):
+        if crossover_operator not in GeneticAlgorithm.CROSSOVERS:
+            raise ValueError("Unknown crossover operator " + str(crossover_operator))
         self.generations = generations
         self.pop_size = pop_size
-
-    # Knuth-Yates shuffle, reordering a array randomly
-    # @param chromosome array to shuffle.
-    def shuffle(self, chromosome):
-        n = len(chromosome)
-        for i in range(n):
-            r = i + int(random.uniform(0, 1) * (n - i))
-            swap = chromosome[r]
-            chromosome[r] = chromosome[i]
-            chromosome[i] = swap
-        return chromosome
-
-    # Gets the total fitness of the population
-    def get_total_fitness(self, tsp_data, population):
-        start_to_product = tsp_data.get_start_distances()
-        product_to_product = tsp_data.get_distances()
-        product_to_end = tsp_data.get_end_distances()
-        fitness = []
-
-        for chromosome in population:
-            steps = 0
-            steps += start_to_product[chromosome[0]]
-            for i in range(len(chromosome)-1):
-                current = chromosome[i]
-                next = chromosome[i + 1]
-                steps += product_to_product[current][next]
-
-            steps += product_to_end[chromosome[len(chromosome) - 1]] + len(chromosome)
-            fitness.append(steps)
-
-        total_fitness = sum(fitness)
-        return total_fitness
-
-    def get_fitness_ratio(self, tsp_data, chromosome, population):
-        start_to_product = tsp_data.get_start_distances()
-        product_to_product = tsp_data.get_distances()
-        product_to_end = tsp_data.get_end_distances()
-
-        fitness = start_to_product[chromosome[0]]
-        for i in range(len(chromosome) - 1):
-            frm = chromosome[i]
-            to = chromosome[i + 1]
-            fitness += product_to_product[frm][to]
-
-        fitness += product_to_end[chromosome[len(chromosome) - 1]] + len(chromosome)
-
-        fitness_ratio = fitness/self.get_total_fitness(tsp_data, population)
-
-        return fitness_ratio
-
-    # Gets the fittest two parents from the population for creating offspring.
-    def selection(self, tsp_data, population):
-        parent_one_fitness = self.get_total_fitness(tsp_data, population)
-        parent_two_fitness = self.get_total_fitness(tsp_data, population)
-        parent_one = None
-        parent_two = None
-
-        for chromosome in population:
-            fitness_ratio = self.get_fitness_ratio(tsp_data, chromosome, population)
-            if fitness_ratio < parent_one_fitness:
-                parent_one_fitness = fitness_ratio
-                parent_one = chromosome
-            elif fitness_ratio < parent_two_fitness:
-                parent_two_fitness = fitness_ratio
-                parent_two = chromosome
-
-        return [parent_one, parent_two]
-
-    # Crossover of two candidate chromosomes.
-    def crossover(self, parent_one, parent_two, pc):
-        offspring_one = []
-        offspring_two = []
-        if np.random.uniform(0, 1) < pc:
-            crossover_point = np.random.randint(0, 17)
-
-            for i in range(crossover_point):
-                offspring_one.append(parent_one[i])
-                offspring_two.append(parent_two[i])
-
-            for j in range(crossover_point, 17):
-                offspring_one.append(parent_two[j])
-                offspring_two.append(parent_one[j])
+        self.pc = pc
+        self.pm = pm
+        self.crossover_operator = crossover_operator
+        self.tournament_size = tournament_size
+        self.local_search = local_search
+        self.termination = termination
+        self.rng = RandomStream(seed)
+        self.distance_source = None
+        self.distance_arrays = None
+        self.fitness_population = None
+        self.fitness = None
+
+    # Random initial population, every chromosome is a random permutation of the products.
+    # @param number_of_products the number of genes of a chromosome.
+    # @return 2-D integer array with a chromosome per row.
+    def initial_population(self, number_of_products):
+        return np.argsort(self.rng.random_block((self.pop_size, number_of_products)), axis=1)
+
+    # Tour lengths of many chromosomes at once.
+    # The distances of all tours are gathered from the TSPData distance arrays in one go.
+    # @param tsp_data the TSP data.
+    # @param chromosomes 2-D integer array with a chromosome per row.
+    # @return array with the number of steps of every tour, including a step per product taken.
+    def get_tour_lengths(self, tsp_data, chromosomes):
+        start_to_product, product_to_product, product_to_end = self.get_distance_arrays(tsp_data)
+        chromosomes = np.atleast_2d(chromosomes)
+        steps = start_to_product[chromosomes[:, 0]] + product_to_end[chromosomes[:, -1]]
+        steps += product_to_product[chromosomes[:, :-1], chromosomes[:, 1:]].sum(axis=1)
+        return steps + chromosomes.shape[1]
+
+    # Distance arrays of the TSP data, converted once per TSPData object.
+    # @param tsp_data the TSP data.
+    # @return tuple of the start, product to product and end distance arrays.
+    def get_distance_arrays(self, tsp_data):
+        if self.distance_source is not tsp_data:
+            self.distance_arrays = (np.asarray(tsp_data.get_start_distances(), dtype=np.int64),
+                                    np.asarray(tsp_data.get_distances(), dtype=np.int64),
+                                    np.asarray(tsp_data.get_end_distances(), dtype=np.int64))
+            self.distance_source = tsp_data
+        return self.distance_arrays
+
+    # Tour lengths of the population. They are cached, and kept up to date when add_fittest_offspring
+    # replaces a chromosome, so they are only computed again for a different population.
+    # @param tsp_data the TSP data.
+    # @param population 2-D integer array with a chromosome per row.
+    # @return array with the number of steps of every tour.
+    def get_population_fitness(self, tsp_data, population):
+        if self.fitness_population is not population:
+            self.fitness = self.get_tour_lengths(tsp_data, population)
+            self.fitness_population = population
+        return self.fitness
+
+    # Tournament selection of pairs of parents.
+    # Every parent is the fittest of tournament_size chromosomes drawn at random from the population.
+    # @param tsp_data the TSP data.
+    # @param population 2-D integer array with a chromosome per row.
+    # @param count the number of pairs.
+    # @return two 2-D arrays with the first and the second parent of every pair.
+    def selection(self, tsp_data, population, count):
+        fitness = self.get_population_fitness(tsp_data, population)
+        contestants = self.rng.integers(0, len(population), (2 * count, self.tournament_size))
+        winners = contestants[np.arange(2 * count), np.argmin(fitness[contestants], axis=1)]
+        return population[winners[:count]], population[winners[count:]]
+
+    # Random segment [a, b) of every row.
+    # @param rows the number of rows.
+    # @param genes the number of genes per row.
+    # @return two arrays with the start and the end of every segment.
+    def cut_points(self, rows, genes):
+        points = np.sort(self.rng.integers(0, genes + 1, (rows, 2)), axis=1)
+        return points[:, 0], points[:, 1]
+
+    # Crossover of pairs of parents. Every pair is crossed over with probability pc, both ways round, and
+    # otherwise copied.
+    # @param parents_one 2-D array with the first parent of every pair.
+    # @param parents_two 2-D array with the second parent of every pair.
+    # @param pc the crossover probability.
+    # @return 2-D array with two offspring per pair.
+    def crossover(self, parents_one, parents_two, pc):
+        if self.crossover_operator == "pmx":
+            operator = self.partially_mapped_crossover
         else:
-            offspring_one = parent_one
-            offspring_two = parent_two
-
-        return [offspring_one, offspring_two]
-
-    # TODO: figure out probabilities
-    def mutation(self, offspring_one, offspring_two, pm):
-
-        if np.random.uniform(0, 1) < pm:
-            mutation_point_one = np.random.choice(17, 2)
-
-            offspring1_element1 = offspring_one[mutation_point_one[0]]
-            offspring1_element2 = offspring_one[mutation_point_one[1]]
-            offspring_one[mutation_point_one[0]] = offspring1_element2
-            offspring_one[mutation_point_one[1]] = offspring1_element1
-
-            mutation_point_two = np.random.choice(17, 2)
-
-            offspring2_element1 = offspring_two[mutation_point_two[0]]
-            offspring2_element2 = offspring_two[mutation_point_two[1]]
-            offspring_two[mutation_point_two[0]] = offspring2_element2
-            offspring_two[mutation_point_two[1]] = offspring2_element1
-
-        return [offspring_one, offspring_two]
-
-    # Gets the least fittest chromosome in the population, to be replaced with offspring.
-    def get_least_fittest_index(self, tsp_data, population):
-        total_fitness = self.get_total_fitness(tsp_data, population)
-        # least_fittest = None
-        least_fittest_fitness = 0
-        for i, chromosome in enumerate(population):
-            fitness_ratio = self.get_fitness_ratio(tsp_data, chromosome, population)
-            if fitness_ratio > least_fittest_fitness:
-                least_fittest_fitness = fitness_ratio
-                least_fittest = i
-
-        return least_fittest
-
-    def get_fittest_offspring(self, tsp_data, population, offspring):
-        fitness_offspring_one = self.get_fitness_ratio(tsp_data, offspring[0], population)
-        fitness_offspring_two = self.get_fitness_ratio(tsp_data, offspring[1], population)
-
-        if fitness_offspring_one < fitness_offspring_two:
-            return offspring[0]
-        else:
-            return offspring[1]
-
-    # Replaces least fittest chromosome by fittest offspring.
-    def add_fittest_offspring(self, tsp_data, population, fittest):
-        index_least_fittest = self.get_least_fittest_index(tsp_data, population)
-
-        population[index_least_fittest] = fittest
-
-        return population
+            operator = self.order_crossover
+        cross = self.rng.random_block(len(parents_one)) < pc
+        offspring_one = parents_one.copy()
+        offspring_two = parents_two.copy()
+        if cross.any():
+            offspring_one[cross] = operator(parents_one[cross], parents_two[cross])
+            offspring_two[cross] = operator(parents_two[cross], parents_one[cross])
+        return np.concatenate([offspring_one, offspring_two])
+
+    # Order crossover (OX) of all pairs at once.
+    # The child keeps a random segment of the first parent, the other positions are filled with the remaining
+    # genes in the order they have in the second parent, starting after the segment.
+    # @param parents_one 2-D array with the first parent of every pair.
+    # @param parents_two 2-D array with the second parent of every pair.
+    # @return 2-D array with a child per pair.
+    def order_crossover(self, parents_one, parents_two):
+        rows, genes = parents_one.shape
+        row = np.arange(rows)[:, None]
+        a, b = self.cut_points(rows, genes)
+        positions = np.arange(genes)
+        in_segment = (positions >= a[:, None]) & (positions < b[:, None])
+        # whether a gene is in the segment of the first parent
+        taken = np.zeros((rows, genes), dtype=bool)
+        taken[row, parents_one] = in_segment
+
+        children = np.where(in_segment, parents_one, -1)
+        rotation = (b[:, None] + positions) % genes
+        rotated = parents_two[row, rotation]
+        keep = ~taken[row, rotated]
+        free = ~in_segment[row, rotation]
+        children[np.nonzero(free)[0], rotation[free]] = rotated[keep]
+        return children
+
+    # Partially mapped crossover (PMX) of all pairs at once.
+    # The child is the second parent with a random segment of the first parent copied in. Genes outside the
+    # segment that the segment already holds are replaced by following the mapping between the two segments.
+    # @param parents_one 2-D array with the first parent of every pair.
+    # @param parents_two 2-D array with the second parent of every pair.
+    # @return 2-D array with a child per pair.
+    def partially_mapped_crossover(self, parents_one, parents_two):
+        rows, genes = parents_one.shape
+        row = np.arange(rows)[:, None]
+        a, b = self.cut_points(rows, genes)
+        positions = np.arange(genes)
+        in_segment = (positions >= a[:, None]) & (positions < b[:, None])
+        taken = np.zeros((rows, genes), dtype=bool)
+        taken[row, parents_one] = in_segment
+        segment_rows, segment_positions = np.nonzero(in_segment)
+        mapping = np.tile(positions, (rows, 1))
+        mapping[segment_rows, parents_one[segment_rows, segment_positions]] = \
+            parents_two[segment_rows, segment_positions]
+
+        children = np.where(in_segment, parents_one, parents_two)
+        conflict = ~in_segment & taken[row, children]
+        while conflict.any():
+            conflict_rows, conflict_positions = np.nonzero(conflict)
+            genes_mapped = mapping[conflict_rows, children[conflict_rows, conflict_positions]]
+            children[conflict_rows, conflict_positions] = genes_mapped
+            conflict[conflict_rows, conflict_positions] = taken[conflict_rows, genes_mapped]
+        return children
+
+    # Inversion mutation of all offspring at once. With probability pm a random segment of a chromosome
+    # is reversed.
+    # @param offspring 2-D array with a chromosome per row.
+    # @param pm the mutation probability.
+    # @return 2-D array with the mutated offspring.
+    def mutation(self, offspring, pm):
+        rows, genes = offspring.shape
+        mutate = self.rng.random_block(rows) < pm
+        a, b = self.cut_points(rows, genes)
+        positions = np.arange(genes)
+        inside = (positions >= a[:, None]) & (positions < b[:, None]) & mutate[:, None]
+        source = np.where(inside, a[:, None] + b[:, None] - 1 - positions, positions)
+        return offspring[np.arange(rows)[:, None], source]
+
+    # Replace the population by the fittest distinct chromosomes of the population and the offspring.
+    # Only the offspring are evaluated, the tour lengths of the survivors are kept in the fitness cache.
+    # @param tsp_data the TSP data.
+    # @param population 2-D array with a chromosome per row.
+    # @param offspring 2-D array with the offspring.
+    # @return the new population.
+    def replace(self, tsp_data, population, offspring):
+        fitness = self.get_population_fitness(tsp_data, population)
+        merged = np.concatenate([population, offspring])
+        merged_fitness = np.concatenate([fitness, self.get_tour_lengths(tsp_data, offspring)])
+        distinct = np.zeros(len(merged), dtype=bool)
+        distinct[np.unique(merged, axis=0, return_index=True)[1]] = True
+        # distinct chromosomes first, fittest first
+        order = np.lexsort((merged_fitness, ~distinct))
+        survivors = order[:len(population)]
+        self.fitness_population = merged[survivors]
+        self.fitness = merged_fitness[survivors]
+        return self.fitness_population
+
+    # Evolve the population by one generation.
+    # @param tsp_data the TSP data.
+    # @param population 2-D array with a chromosome per row.
+    # @return the next population, fittest chromosome first.
+    def evolve(self, tsp_data, population):
+        parents_one, parents_two = self.selection(tsp_data, population, (self.pop_size + 1) // 2)
+        offspring = self.crossover(parents_one, parents_two, self.pc)
+        offspring = self.mutation(offspring, self.pm)
+        if self.local_search is not None:
+            fittest = int(np.argmin(self.get_tour_lengths(tsp_data, offspring)))
+            offspring[fittest] = self.local_search.improve(offspring[fittest])
+        return self.replace(tsp_data, population, offspring)
+
+    # The termination criterion of a run, started anew.
+    # @return the Termination
+    def get_termination(self):
+        termination = self.termination
+        if termination is None:
+            termination = Termination(max_iterations=self.generations)
+        termination.start()
+        return termination
 
     # This method should solve the TSP.
     # @param pd the TSP data.
     # @return the optimized product sequence.
     def solve_tsp(self, tsp_data):
-        path = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 16, 17]
-        population = []
-        for i in range(self.pop_size):
-            population.append(self.shuffle(path))
-
-        stop = 0
-        # TODO: while loop until convergence criteria is met
-        while stop < generations:
-            parents = self.selection(tsp_data, population)
-            offspring = self.crossover(parents[0], parents[1], 0.7)
-
-            offspring = self.mutation(offspring[0], offspring[1], 0.005)
-
-            fittest = self.get_fittest_offspring(tsp_data, population, offspring)
-
-            population = self.add_fittest_offspring(tsp_data, population, fittest)
-
-            print(stop)
-            stop += 1
-
-        return path
+        number_of_products = len(tsp_data.product_locations)
+        if number_of_products < 2:
+            return list(range(number_of_products))
+        population = self.initial_population(number_of_products)
+
+        termination = self.get_termination()
+        generation = 0
+        while not termination.should_stop():
+            population = self.evolve(tsp_data, population)
+            print("generation", str(generation), "shortest:", str(self.fitness[0]))
+            termination.update(int(self.fitness[0]))
+            generation += 1
+        print("Stopped after " + str(generation) + " generations: " + str(termination.reason))
+
+        fitness = self.get_population_fitness(tsp_data, population)
+        return population[int(np.argmin(fitness))].tolist()
 
 
 # Assignment 2.b
@@ -0,0 +1,169 @@
+import os, sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import queue
+import time
+import numpy as np
+from multiprocessing import Barrier, Process, Queue, Value, shared_memory
+from src.GeneticAlgorithm import GeneticAlgorithm
+from src.RandomStream import RandomStream
+from src.TSPData import TSPData
+
+
+# TSP problem solver running several genetic algorithm populations (islands) in separate processes.
+# The islands are connected in a ring. Every migration_interval generations each island sends copies of its
+# fittest chromosomes to the next island and takes in the migrants of the previous one, which replace its least
+# fit chromosomes. The distance arrays of the TSPData are put in shared memory once, the islands read them from
+# there instead of receiving a pickled copy.
+# The islands stop on the termination of the genetic algorithm. Every island has the same iteration cap, so they
+# all reach it at the same generation. Any other criterion is only checked at migrations, where the islands agree
+# on it: once one island meets its criterion, all islands stop together.
+# When an island process dies the others would wait for it forever, so the islands only wait for each other for a
+# limited time, and the parent checks the island processes while it waits for their results.
+class IslandModel:
+
+    # Constructs a new island model.
+    # @param ga the genetic algorithm every island runs, its generations are the generations per island.
+    # @param islands the number of islands, each runs in its own process.
+    # @param migration_interval the number of generations between migrations.
+    # @param migrants the number of chromosomes an island sends at every migration.
+    # @param seed seed for the random generators of the islands, None for a random seed.
+    # @param timeout seconds an island waits for the other islands and their migrants at a migration.
+    def __init__(self, ga, islands=None, migration_interval=10, migrants=2, seed=None, timeout=60):
+        self.ga = ga
+        self.islands = islands if islands is not None else os.cpu_count()
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.rng = RandomStream(seed)
+        self.timeout = timeout
+
+    # This method should solve the TSP.
+    # @param tsp_data the TSP data.
+    # @return the optimized product sequence, the best one found on any island.
+    def solve_tsp(self, tsp_data):
+        number_of_products = len(tsp_data.product_locations)
+        if number_of_products < 2:
+            return list(range(number_of_products))
+
+        arrays = [np.asarray(tsp_data.get_start_distances(), dtype=np.int64).ravel(),
+                  np.asarray(tsp_data.get_distances(), dtype=np.int64).ravel(),
+                  np.asarray(tsp_data.get_end_distances(), dtype=np.int64).ravel()]
+        size = sum(array.nbytes for array in arrays)
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            np.ndarray((size // 8,), dtype=np.int64, buffer=memory.buf)[:] = np.concatenate(arrays)
+            inboxes = [Queue() for island in range(self.islands)]
+            results = Queue()
+            barrier = Barrier(self.islands)
+            stop = Value("q", np.iinfo(np.int64).max)
+            streams = self.rng.spawn(self.islands)
+            processes = []
+            for island in range(self.islands):
+                process = Process(target=IslandModel.run_island,
+                                  args=(self, island, memory.name, tsp_data.product_locations, inboxes[island],
+                                        inboxes[(island + 1) % self.islands], results, barrier, stop,
+                                        streams[island]))
+                process.start()
+                processes.append(process)
+            best = self.collect_results(processes, results, barrier)
+            for process in processes:
+                process.join()
+        finally:
+            memory.close()
+            memory.unlink()
+        # ties go to the lowest island, so a seeded run always returns the same order
+        best.sort()
+        print("Island results: " + str([result[0] for result in best]))
+        return best[0][2]
+
+    # Wait for the result of every island.
+    # The island processes are checked while waiting. When one of them died the barrier is aborted and the other
+    # islands are stopped, instead of waiting for it forever.
+    # @param processes the island processes
+    # @param results queue the islands put their result on
+    # @param barrier barrier the islands meet at before every migration
+    # @return list with the result of every island
+    def collect_results(self, processes, results, barrier):
+        best = []
+        while len(best) < len(processes):
+            try:
+                best.append(results.get(timeout=1))
+                continue
+            except queue.Empty:
+                pass
+            failed = [island for island in range(len(processes)) if processes[island].exitcode not in (None, 0)]
+            finished = all(process.exitcode is not None for process in processes)
+            if len(failed) > 0 or finished:
+                barrier.abort()
+                for process in processes:
+                    if process.is_alive():
+                        process.terminate()
+                    process.join()
+                if len(failed) == 0:
+                    raise RuntimeError("Islands finished without sending a result")
+                raise RuntimeError("Island " + str(failed[0]) + " stopped with exit code "
+                                   + str(processes[failed[0]].exitcode))
+        return best
+
+    # Evolve a single island, run in its own process.
+    # @param island the number of the island.
+    # @param memory_name name of the shared memory block with the start, product and end distances.
+    # @param product_locations the product locations of the TSP data.
+    # @param inbox queue the migrants for this island arrive on.
+    # @param outbox queue of the next island.
+    # @param results queue for the length of the fittest chromosome of this island, the island and the chromosome.
+    # @param barrier barrier all islands meet at before every migration.
+    # @param stop shared value with the first migration at which an island asked to stop.
+    # @param rng RandomStream of this island.
+    def run_island(self, island, memory_name, product_locations, inbox, outbox, results, barrier, stop, rng):
+        number_of_products = len(product_locations)
+        memory = shared_memory.SharedMemory(name=memory_name)
+        arrays = np.ndarray((number_of_products * (number_of_products + 2),), dtype=np.int64, buffer=memory.buf)
+        tsp_data = TSPData(product_locations, None)
+        tsp_data.start_distances = arrays[:number_of_products]
+        tsp_data.distances = arrays[number_of_products:-number_of_products].reshape(number_of_products,
+                                                                                    number_of_products)
+        tsp_data.end_distances = arrays[-number_of_products:]
+
+        ga = self.ga
+        ga.rng = rng
+        population = ga.initial_population(number_of_products)
+        termination = ga.get_termination()
+        generation = 0
+        while True:
+            population = ga.evolve(tsp_data, population)
+            generation += 1
+            termination.update(int(ga.fitness[0]))
+            stopping = termination.should_stop()
+            if stopping and termination.reason == "iterations":
+                break
+            if generation % self.migration_interval == 0:
+                migration = generation // self.migration_interval
+                if stopping:
+                    with stop.get_lock():
+                        stop.value = min(stop.value, migration)
+                barrier.wait(self.timeout)
+                if stop.value <= migration:
+                    break
+                outbox.put(population[:self.migrants].copy())
+                population = ga.replace(tsp_data, population, inbox.get(timeout=self.timeout))
+        results.put((int(ga.fitness[0]), island, population[0].tolist()))
+
+        # the shared memory can only be closed once no array points into it anymore
+        ga.distance_source = None
+        ga.distance_arrays = None
+        del tsp_data, arrays
+        memory.close()
+
+
+# Run the island model on persisted TSP data.
+if __name__ == "__main__":
+    persist_file = "./../data/productMatrixDist"
+    tsp_data = TSPData.read_from_file(persist_file)
+    island_model = IslandModel(GeneticAlgorithm(200, 50))
+
+    start_time = time.time()
+    solution = island_model.solve_tsp(tsp_data)
+    print("Time taken: " + str(round(time.time() - start_time, 3)))
+    tsp_data.write_action_file(solution, "./../data/TSP solution.txt")
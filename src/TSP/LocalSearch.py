@@ -0,0 +1,169 @@
+import os, sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+from src.TSPData import TSPData
+
+
+# Local search for product orders with 2-opt and Or-opt moves.
+# A tour is walked from the start, along all products to the end, so it is held as the sequence
+# start, products..., end over the cost matrix of TSPData. Moves are only tried towards the nearest products of
+# every product, and every move is rated by its change in length in constant time:
+# 2-opt reverses a part of the tour, Or-opt moves a part of one to three products elsewhere.
+# The distances between products do not have to be symmetric, the cost of walking a part of the tour backwards
+# is taken from running sums over the tour that are updated after every applied move.
+class LocalSearch:
+
+    # Constructs a new local search for a TSP.
+    # @param tsp_data the TSP data.
+    # @param neighbours the number of nearest products moves are tried towards.
+    # @param maximum_segment the longest part of the tour Or-opt moves.
+    def __init__(self, tsp_data, neighbours=8, maximum_segment=3):
+        cost = tsp_data.get_cost_matrix()
+        self.number_of_products = len(tsp_data.product_locations)
+        self.start = self.number_of_products
+        self.end = self.number_of_products + 1
+        self.cost = cost.tolist()
+        self.maximum_segment = maximum_segment
+
+        # nearest products of every product, by the length of the way there and back, and of the start
+        products = cost[:self.number_of_products, :self.number_of_products]
+        closeness = (products + products.T).astype(np.float64)
+        np.fill_diagonal(closeness, np.inf)
+        count = min(neighbours, max(self.number_of_products - 1, 0))
+        self.neighbours = np.argsort(closeness, axis=1, kind="stable")[:, :count].tolist()
+        start_distances = cost[self.start, :self.number_of_products]
+        self.neighbours.append(np.argsort(start_distances, kind="stable")[:count].tolist())
+
+    # Length of a product order, counted the same way as GeneticAlgorithm and TSPData.write_action_file.
+    # @param tour the product order.
+    # @return the number of steps including a step per product taken.
+    def get_tour_length(self, tour):
+        sequence = [self.start] + list(tour) + [self.end]
+        cost = self.cost
+        return sum(cost[sequence[i]][sequence[i + 1]] for i in range(len(sequence) - 1)) + len(tour)
+
+    # Improve a product order with 2-opt and Or-opt moves until neither finds an improvement.
+    # @param tour the product order.
+    # @return the improved product order as a list.
+    def improve(self, tour):
+        sequence = [self.start] + [int(product) for product in tour] + [self.end]
+        if self.number_of_products < 3:
+            return sequence[1:-1]
+        improved = True
+        while improved:
+            improved = self.two_opt(sequence)
+            improved = self.or_opt(sequence) or improved
+        return sequence[1:-1]
+
+    # Apply improving 2-opt moves to a tour sequence until none is left.
+    # Reversing the products at positions i to j replaces the edges into i and out of j, and walks the part in
+    # between backwards. Only moves creating an edge between a product and one of its nearest products are tried.
+    # @param sequence the tour as start, products..., end, changed in place.
+    # @return whether any move was applied.
+    def two_opt(self, sequence):
+        cost = self.cost
+        last = len(sequence) - 2
+        any_improvement = False
+        improved = True
+        while improved:
+            improved = False
+            position, forward, backward = self.get_running_sums(sequence)
+            for i in range(1, last + 1):
+                before = sequence[i - 1]
+                first = sequence[i]
+                # candidates for the product placed at position i, reached from before
+                for candidate in self.neighbours[before]:
+                    j = position[candidate]
+                    if j <= i:
+                        continue
+                    after = sequence[j + 1]
+                    delta = cost[before][candidate] + backward[j] - backward[i] + cost[first][after] \
+                        - cost[before][first] - forward[j] + forward[i] - cost[candidate][after]
+                    if delta < 0:
+                        sequence[i:j + 1] = sequence[i:j + 1][::-1]
+                        improved = True
+                        any_improvement = True
+                        break
+                if improved:
+                    break
+        return any_improvement
+
+    # Apply improving Or-opt moves to a tour sequence until none is left.
+    # A part of one up to maximum_segment products is taken out and put back between a product close to its first
+    # product and the next one in the tour.
+    # @param sequence the tour as start, products..., end, changed in place.
+    # @return whether any move was applied.
+    def or_opt(self, sequence):
+        cost = self.cost
+        last = len(sequence) - 2
+        any_improvement = False
+        improved = True
+        while improved:
+            improved = False
+            position = self.get_positions(sequence)
+            for length in range(1, self.maximum_segment + 1):
+                for i in range(1, last - length + 2):
+                    first = sequence[i]
+                    final = sequence[i + length - 1]
+                    before = sequence[i - 1]
+                    after = sequence[i + length]
+                    gain = cost[before][first] + cost[final][after] - cost[before][after]
+                    if gain <= 0:
+                        continue
+                    for candidate in self.neighbours[first]:
+                        g = position[candidate]
+                        if i - 1 <= g < i + length:
+                            continue
+                        following = sequence[g + 1]
+                        delta = cost[candidate][first] + cost[final][following] \
+                            - cost[candidate][following] - gain
+                        if delta < 0:
+                            segment = sequence[i:i + length]
+                            del sequence[i:i + length]
+                            insert = g + 1 if g < i else g + 1 - length
+                            sequence[insert:insert] = segment
+                            improved = True
+                            any_improvement = True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+        return any_improvement
+
+    # Position of every product in a tour sequence.
+    # @param sequence the tour as start, products..., end.
+    # @return list with the position of every product.
+    def get_positions(self, sequence):
+        position = [0] * self.number_of_products
+        for i in range(1, len(sequence) - 1):
+            position[sequence[i]] = i
+        return position
+
+    # Positions and running sums of a tour sequence.
+    # forward[p] is the length from the start to position p, backward[p] is the length of walking the same edges
+    # the other way round, so the cost of a part walked backwards is a difference of two entries.
+    # @param sequence the tour as start, products..., end.
+    # @return tuple of the positions, forward sums and backward sums.
+    def get_running_sums(self, sequence):
+        cost = self.cost
+        forward = [0] * len(sequence)
+        backward = [0] * len(sequence)
+        for p in range(1, len(sequence)):
+            forward[p] = forward[p - 1] + cost[sequence[p - 1]][sequence[p]]
+            backward[p] = backward[p - 1] + cost[sequence[p]][sequence[p - 1]]
+        return self.get_positions(sequence), forward, backward
+
+
+# Improve the product order 0, 1, 2, ... of the persisted TSP data and print it.
+if __name__ == "__main__":
+    persist_file = "./../data/productMatrixDist"
+    tsp_data = TSPData.read_from_file(persist_file, load_routes=False)
+    local_search = LocalSearch(tsp_data)
+    order = list(range(len(tsp_data.product_locations)))
+    improved = local_search.improve(order)
+    print("Length before: " + str(local_search.get_tour_length(order)))
+    print("Length after: " + str(local_search.get_tour_length(improved)))
+    print(improved)
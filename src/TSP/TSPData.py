@@ -5,16 +5,26 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 import pickle
 import re
 import traceback
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from src.AntColonyOptimization import AntColonyOptimization
 from src.Coordinate import Coordinate
 from src.Maze import Maze
 from src.PathSpecification import PathSpecification
+from src.Route import Route
 
 
 # Class containing the product distances. Can be either build from a maze, a product
 # location list and a PathSpecification or be reloaded from a file.
 class TSPData:
 
+    # Magic bytes and version of the compact binary file format.
+    MAGIC = b"TSPDATA\0"
+    VERSION = 1
+
+    # Route solver of a worker process, set by init_worker.
+    worker_aco = None
+
     # Constructs a new TSP data object.
     # @param productLocations the productlocations.
     # @param spec the path specification.
@@ -31,14 +41,320 @@ class TSPData:
 
     # Calculate the routes from the product locations to each other, the start, and the end.
     # Additionally generate arrays that contain the length of all the routes.
-    # @param maze
-    def calculate_routes(self, aco):
-        self.product_to_product = self.build_distance_matrix(aco)
-        self.start_to_product = self.build_start_to_products(aco)
-        self.product_to_end = self.build_products_to_end(aco)
+    # Solvers with shares_runs set find all routes from one location in a single run of find_shortest_routes,
+    # which takes k + 2 runs for k products. Other solvers get a job for every route, so the jobs are small and
+    # spread evenly over the workers.
+    # All runs are independent, so with more than one worker they are spread over a process pool.
+    # Every worker gets its own copy of the optimization object and its maze, and the maze pheromones
+    # are reset for every run.
+    # Routes from a product to itself are empty and never solved. With symmetric set only the routes from a
+    # product to the products after it are solved, the routes back are the same paths walked in reverse.
+    # @param aco Route solver with a find_shortest_route method
+    # @param workers Number of worker processes, 1 calculates all routes in this process
+    # @param symmetric Whether to derive the product to product routes j to i from the routes i to j
+    def calculate_routes(self, aco, workers=1, symmetric=False):
+        jobs = self.route_jobs(symmetric, getattr(aco, "shares_runs", False))
+        routes = self.solve_route_jobs(aco, jobs, workers)
+        number_of_products = len(self.product_locations)
+        self.product_to_product = [[None] * number_of_products for i in range(number_of_products)]
+        self.start_to_product = [None] * number_of_products
+        self.product_to_end = [None] * number_of_products
+        for i in range(number_of_products):
+            self.product_to_product[i][i] = Route(self.product_locations[i])
+        self.store_routes(routes, symmetric)
         self.build_distance_lists()
         return
 
+    # Bring the routes up to date after the layout of the maze has changed.
+    # The walls have to be changed on the maze of the route solver with Maze.apply_wall_diff first. Only the
+    # routes that step on a closed tile, and the routes an opened tile could make shorter, are solved again.
+    # A route through an opened tile is at least as long as the manhattan distance from its start to the tile
+    # plus the manhattan distance from the tile to its end, so routes that are not longer than that for every
+    # opened tile are kept. Routes that were not found before are always solved again when tiles are opened.
+    # @param aco Route solver with a find_shortest_route method, working on the changed maze
+    # @param opened Coordinates of the tiles that became accessible
+    # @param closed Coordinates of the tiles that became walls
+    # @param workers Number of worker processes, 1 calculates all routes in this process
+    # @param symmetric Whether the routes were calculated with symmetric set
+    # @return list with the keys of the routes that were solved again
+    def update_routes(self, aco, opened=(), closed=(), workers=1, symmetric=False):
+        # worker processes of the solver hold a copy of the maze from before the change
+        if hasattr(aco, "close"):
+            aco.close()
+        keys = self.get_changed_route_keys(opened, closed, symmetric)
+        jobs = self.group_route_jobs(keys, getattr(aco, "shares_runs", False))
+        routes = self.solve_route_jobs(aco, jobs, workers)
+        self.store_routes(routes, symmetric)
+        self.build_distance_lists()
+        return keys
+
+    # Keys of the routes that are affected by a change of the walls.
+    # Whether a route was found is decided from the locations of its key, an empty route is only a real route
+    # when its key starts and ends at the same location.
+    # @param opened Coordinates of the tiles that became accessible
+    # @param closed Coordinates of the tiles that became walls
+    # @param symmetric Whether only the product to product routes i to j with i < j are solved
+    # @return list of route keys as made by route_keys
+    def get_changed_route_keys(self, opened, closed, symmetric=False):
+        opened_x = np.array([position.get_x() for position in opened], dtype=np.int64)
+        opened_y = np.array([position.get_y() for position in opened], dtype=np.int64)
+        closed_tiles = np.array([(position.get_x() << 32) + position.get_y() for position in closed],
+                                dtype=np.int64)
+        changed = []
+        for key in self.route_keys(symmetric):
+            route = self.get_route(key)
+            start = self.get_route_start(key)
+            end = self.get_route_end(key)
+            if len(closed_tiles) > 0:
+                xs, ys = Maze.route_cells(route)
+                tiles = np.append((xs << 32) + ys, (start.get_x() << 32) + start.get_y())
+                if np.isin(tiles, closed_tiles).any():
+                    changed.append(key)
+                    continue
+            if len(opened_x) > 0:
+                if route.size() == 0:
+                    if not start == end:
+                        changed.append(key)
+                    continue
+                detour = np.abs(opened_x - start.get_x()) + np.abs(opened_y - start.get_y()) \
+                    + np.abs(end.get_x() - opened_x) + np.abs(end.get_y() - opened_y)
+                if detour.min() < route.size():
+                    changed.append(key)
+        return changed
+
+    # Store solved routes in the route lists.
+    # @param routes dictionary from route key to route
+    # @param symmetric Whether to also store the product to product route j to i as the route i to j reversed,
+    # a route that was not found is stored as an empty route from product j
+    def store_routes(self, routes, symmetric=False):
+        for key, route in routes.items():
+            if key[0] == "product":
+                self.product_to_product[key[1]][key[2]] = route
+                if symmetric:
+                    self.product_to_product[key[2]][key[1]] = route.reverse() if route.size() > 0 \
+                        else Route(self.product_locations[key[2]])
+            elif key[0] == "start":
+                self.start_to_product[key[1]] = route
+            else:
+                self.product_to_end[key[1]] = route
+
+    # Route belonging to a route key.
+    # @param key ("product", i, j), ("start", i) or ("end", i)
+    # @return the route
+    def get_route(self, key):
+        if key[0] == "product":
+            return self.product_to_product[key[1]][key[2]]
+        if key[0] == "start":
+            return self.start_to_product[key[1]]
+        return self.product_to_end[key[1]]
+
+    # Coordinate a route key starts at, also for routes that were not found.
+    # @param key ("product", i, j), ("start", i) or ("end", i)
+    # @return the start coordinate
+    def get_route_start(self, key):
+        if key[0] == "start":
+            return self.spec.get_start()
+        return self.product_locations[key[1]]
+
+    # Coordinate a route key leads to, also for routes that were not found.
+    # @param key ("product", i, j), ("start", i) or ("end", i)
+    # @return the end coordinate
+    def get_route_end(self, key):
+        if key[0] == "product":
+            return self.product_locations[key[2]]
+        if key[0] == "start":
+            return self.product_locations[key[1]]
+        return self.spec.get_end()
+
+    # Keys of all the routes needed for the TSP, except the empty routes from a product to itself.
+    # The keys are ("start", i) for the route from the start to product i, ("product", i, j) for the route from
+    # product i to product j and ("end", i) for the route from product i to the end.
+    # @param symmetric Whether to only include the product to product routes i to j with i < j
+    # @return list of route keys
+    def route_keys(self, symmetric=False):
+        number_of_products = len(self.product_locations)
+        keys = [("start", i) for i in range(number_of_products)]
+        for i in range(number_of_products):
+            for j in range(i + 1 if symmetric else 0, number_of_products):
+                if i != j:
+                    keys.append(("product", i, j))
+        keys.extend(("end", i) for i in range(number_of_products))
+        return keys
+
+    # All the routes needed for the TSP, except the empty routes from a product to itself, grouped in jobs.
+    # @param symmetric Whether to only include the product to product routes i to j with i < j
+    # @param one_to_many Whether to group all routes from one location in one job, or make a job per route
+    # @return list of jobs as made by group_route_jobs
+    def route_jobs(self, symmetric=False, one_to_many=True):
+        return self.group_route_jobs(self.route_keys(symmetric), one_to_many)
+
+    # Group routes in jobs.
+    # A job is a tuple (source, targets, keys, reverse) asking for the routes from the source to every target.
+    # The routes to the end are asked from the end to every product with reverse set, meaning the job is
+    # done when it has the routes from every target back to the source.
+    # @param keys list of route keys as made by route_keys
+    # @param one_to_many Whether to group all routes from one location in one job, or make a job per route
+    # @return list of jobs, in the order of the first key of every job
+    def group_route_jobs(self, keys, one_to_many=True):
+        groups = {}
+        for key in keys:
+            groups.setdefault(key[:2] if key[0] == "product" else key[:1], []).append(key)
+        jobs = []
+        for group_keys in groups.values():
+            kind = group_keys[0][0]
+            if kind == "start":
+                source = self.spec.get_start()
+            elif kind == "product":
+                source = self.product_locations[group_keys[0][1]]
+            else:
+                source = self.spec.get_end()
+            targets = [self.product_locations[key[-1] if kind == "product" else key[1]] for key in group_keys]
+            if one_to_many:
+                jobs.append((source, targets, group_keys, kind == "end"))
+            else:
+                for i in range(len(targets)):
+                    jobs.append((source, [targets[i]], [group_keys[i]], kind == "end"))
+        return jobs
+
+    # Solve a list of route jobs, printing the progress.
+    # Solvers with a RandomStream rng get an independent stream spawned from it for every job, so the routes do not
+    # depend on the number of workers or on the order the jobs are done in.
+    # The route cache of a solver is looked up and filled in this process, the workers get the solver without it,
+    # so the cached routes and the cache statistics stay with the solver of the caller.
+    # @param aco Route solver with a find_shortest_route method
+    # @param jobs list of jobs as made by route_jobs
+    # @param workers Number of worker processes
+    # @return dictionary from route key to route
+    def solve_route_jobs(self, aco, jobs, workers):
+        routes = {}
+        total = sum(len(job[2]) for job in jobs)
+        streams = aco.rng.spawn(len(jobs)) if hasattr(aco, "rng") else [None] * len(jobs)
+        if workers <= 1:
+            for job, stream in zip(jobs, streams):
+                routes.update(zip(job[2], TSPData.solve_job(aco, job, stream)))
+                print("Routes calculated: " + str(len(routes)) + "/" + str(total))
+            return routes
+        cache = getattr(aco, "cache", None)
+        if cache is not None:
+            jobs, streams = TSPData.take_cached_routes(aco, jobs, streams, routes)
+            aco.cache = None
+        try:
+            with ProcessPoolExecutor(workers, initializer=TSPData.init_worker, initargs=(aco,)) as executor:
+                futures = {}
+                for job, stream in zip(jobs, streams):
+                    futures[executor.submit(TSPData.solve_route_job, job, stream)] = job
+                for future in as_completed(futures):
+                    job = futures[future]
+                    found = future.result()
+                    routes.update(zip(job[2], found))
+                    if cache is not None:
+                        TSPData.put_cached_routes(aco, cache, job, found)
+                    print("Routes calculated: " + str(len(routes)) + "/" + str(total))
+        finally:
+            if cache is not None:
+                aco.cache = cache
+        return routes
+
+    # Take the routes of jobs from the route cache of the solver.
+    # The routes are looked up from the source of a job to its targets, as the solver does itself.
+    # @param aco Route solver with a cache and a get_cache_key method
+    # @param jobs list of jobs as made by route_jobs
+    # @param streams list with the RandomStream of every job
+    # @param routes dictionary from route key to route the cached routes are added to
+    # @return tuple of the jobs for the routes that are not cached and their streams
+    @staticmethod
+    def take_cached_routes(aco, jobs, streams, routes):
+        remaining_jobs = []
+        remaining_streams = []
+        for job, stream in zip(jobs, streams):
+            source, targets, keys, reverse = job
+            missing_targets = []
+            missing_keys = []
+            for target, key in zip(targets, keys):
+                route = None
+                if not target == source:
+                    route = aco.cache.get(aco.get_cache_key(source, target), source)
+                if route is None:
+                    missing_targets.append(target)
+                    missing_keys.append(key)
+                else:
+                    routes[key] = route.reverse() if reverse else route
+            if len(missing_keys) > 0:
+                remaining_jobs.append((source, missing_targets, missing_keys, reverse))
+                remaining_streams.append(stream)
+        print("Routes from the cache: " + str(len(routes)))
+        return remaining_jobs, remaining_streams
+
+    # Put the routes a worker found for a job in the route cache of the solver.
+    # @param aco Route solver with a get_cache_key method
+    # @param cache the route cache of the solver
+    # @param job tuple (source, targets, keys, reverse) as made by route_jobs
+    # @param found list with the route of every target of the job
+    @staticmethod
+    def put_cached_routes(aco, cache, job, found):
+        source, targets, keys, reverse = job
+        for target, route in zip(targets, found):
+            if route.size() > 0:
+                cache.put(aco.get_cache_key(source, target), route.reverse() if reverse else route)
+
+    # Solve a single route job.
+    # @param aco Route solver with a find_shortest_route method
+    # @param job tuple (source, targets, keys, reverse) as made by route_jobs
+    # @param rng RandomStream the solver uses for this job only, None to leave the solver as it is
+    # @return list with the route of every target of the job
+    @staticmethod
+    def solve_job(aco, job, rng=None):
+        if rng is None:
+            return TSPData.solve_job_routes(aco, job)
+        previous = aco.rng
+        aco.rng = rng
+        try:
+            return TSPData.solve_job_routes(aco, job)
+        finally:
+            aco.rng = previous
+
+    # Ask the solver for the routes of a job.
+    # Routes of a reversed job that were not found are empty routes from their target, like every route that was
+    # not found starts where it was asked to start.
+    # @param aco Route solver with a find_shortest_route method
+    # @param job tuple (source, targets, keys, reverse) as made by route_jobs
+    # @return list with the route of every target of the job
+    @staticmethod
+    def solve_job_routes(aco, job):
+        source, targets, keys, reverse = job
+        if hasattr(aco, "find_shortest_routes"):
+            routes = aco.find_shortest_routes(source, targets)
+            if reverse:
+                routes = [route.reverse() if route.size() > 0 else Route(target)
+                          for route, target in zip(routes, targets)]
+            return routes
+        routes = []
+        for target in targets:
+            if reverse:
+                routes.append(aco.find_shortest_route(PathSpecification(target, source)))
+            else:
+                routes.append(aco.find_shortest_route(PathSpecification(source, target)))
+        return routes
+
+    # Set up a worker process with its own copy of the route solver.
+    # @param aco Route solver with a find_shortest_route method
+    @staticmethod
+    def init_worker(aco):
+        TSPData.worker_aco = aco
+
+    # Task run by a worker: solve a single route job.
+    # @param job tuple (source, targets, keys, reverse) as made by route_jobs
+    # @param rng RandomStream for the job, or None
+    # @return list with the route of every target of the job
+    @staticmethod
+    def solve_route_job(job, rng=None):
+        return TSPData.solve_job(TSPData.worker_aco, job, rng)
+
+    # All the locations a route starts or ends at, the tiles Maze.prune_dead_ends has to keep.
+    # @return list with the start, the end and the product locations
+    def get_locations(self):
+        return [self.spec.get_start(), self.spec.get_end()] + list(self.product_locations)
+
     # Build a list of integer distances of all the product-product routes.
     def build_distance_lists(self):
         number_of_products = len(self.product_locations)
@@ -69,11 +385,25 @@ class TSPData:
     def get_end_distances(self):
         return self.end_distances
 
+    # Cost matrix over the products, the start and the end.
+    # Products keep their index, index k is the start and index k + 1 the end for k products. Entry [i][j] is the
+    # number of steps from i to j. Steps into the start and out of the end are never part of a tour and are 0.
+    # @return (k + 2) x (k + 2) int64 array
+    def get_cost_matrix(self):
+        number_of_products = len(self.product_locations)
+        cost = np.zeros((number_of_products + 2, number_of_products + 2), dtype=np.int64)
+        cost[:number_of_products, :number_of_products] = self.distances
+        cost[number_of_products, :number_of_products] = self.start_distances
+        cost[:number_of_products, number_of_products + 1] = self.end_distances
+        return cost
+
     # Equals method
     # @param other other TSPData to check
     # @return boolean whether equal
     def __eq__(self, other):
-        return self.distances == other.distances \
+        return np.array_equal(self.distances, other.distances) \
+               and np.array_equal(self.start_distances, other.start_distances) \
+               and np.array_equal(self.end_distances, other.end_distances) \
                and self.product_to_product == other.product_to_product \
                and self.product_to_end == other.product_to_end \
                and self.start_to_product == other.start_to_product \
@@ -81,14 +411,54 @@ class TSPData:
                and self.product_locations == other.product_locations
 
     # Persist object to file so that it can be reused later
+    # The compact binary format stores the distances as int32 arrays and the routes as one stream of 2 bits per
+    # step. The layout after the magic bytes is an int64 header (version, number of products, start x and y,
+    # end x and y, whether routes are included, 0) followed by int32 sections: the product locations (k x 2),
+    # the start distances (k), the distances (k x k) and the end distances (k). With routes these are followed
+    # by the int64 route offsets (k*k + 2k + 1) and the packed directions of the product to product routes
+    # (row by row), the start to product routes and the product to end routes. Every section starts at a
+    # multiple of 8 bytes.
     # @param filePath Path to persist to
-    def write_to_file(self, file_path):
-        pickle.dump(self, open(file_path, "wb"))
+    # @param binary Whether to write the compact binary format instead of a pickle
+    def write_to_file(self, file_path, binary=True):
+        if not binary:
+            pickle.dump(self, open(file_path, "wb"))
+            return
+        number_of_products = len(self.product_locations)
+        has_routes = self.product_to_product is not None
+        header = np.array([TSPData.VERSION, number_of_products,
+                           self.spec.get_start().get_x(), self.spec.get_start().get_y(),
+                           self.spec.get_end().get_x(), self.spec.get_end().get_y(), int(has_routes), 0],
+                          dtype=np.int64)
+        sections = [header,
+                    np.array([[c.get_x(), c.get_y()] for c in self.product_locations], dtype=np.int32),
+                    np.asarray(self.start_distances, dtype=np.int32),
+                    np.asarray(self.distances, dtype=np.int32),
+                    np.asarray(self.end_distances, dtype=np.int32)]
+        if has_routes:
+            offsets, packed = Route.pack_routes(self.get_all_routes())
+            sections.append(offsets)
+            sections.append(packed)
+        with open(file_path, "wb") as f:
+            f.write(TSPData.MAGIC)
+            for section in sections:
+                f.write(section.tobytes())
+                f.write(bytes(-section.nbytes % 8))
 
-    # Write away an action file based on a solution from the TSP problem.
+    # All routes in the order of the binary file format.
+    # @return list of routes: the product to product routes row by row, start to products, products to end
+    def get_all_routes(self):
+        routes = []
+        for row in self.product_to_product:
+            routes.extend(row)
+        routes.extend(self.start_to_product)
+        routes.extend(self.product_to_end)
+        return routes
+
+    # Length of the walk from the start along the products in the given order to the end.
     # @param productOrder Solution of the TSP problem
-    # @param filePath Path to the solution file
-    def write_action_file(self, product_order, file_path):
+    # @return the number of steps, including a step to take every product
+    def get_tour_length(self, product_order):
         total_length = self.start_distances[product_order[0]]
         for i in range(len(product_order) - 1):
             frm = product_order[i]
@@ -96,6 +466,13 @@ class TSPData:
             total_length += self.distances[frm][to]
 
         total_length += self.end_distances[product_order[len(product_order) - 1]] + len(product_order)
+        return int(total_length)
+
+    # Write away an action file based on a solution from the TSP problem.
+    # @param productOrder Solution of the TSP problem
+    # @param filePath Path to the solution file
+    def write_action_file(self, product_order, file_path):
+        total_length = self.get_tour_length(product_order)
 
         string = ""
         string += str(total_length)
@@ -119,46 +496,63 @@ class TSPData:
         f = open(file_path, "w")
         f.write(string)
 
-    # Calculate the optimal routes between all the individual routes
-    # @param maze Maze to calculate optimal routes in
-    # @return Optimal routes between all products in 2d array
-    def build_distance_matrix(self, aco):
-        number_of_product = len(self.product_locations)
-        product_to_product = []
-        for i in range(number_of_product):
-            product_to_product.append([])
-            for j in range(number_of_product):
-                start = self.product_locations[i]
-                end = self.product_locations[j]
-                product_to_product[i].append(aco.find_shortest_route(PathSpecification(start, end)))
-        return product_to_product
-
-    # Calculate optimal route between the start and all the products
-    # @param maze Maze to calculate optimal routes in
-    # @return Optimal route from start to products
-    def build_start_to_products(self, aco):
-        start = self.spec.get_start()
-        start_to_products = []
-        for i in range(len(self.product_locations)):
-            start_to_products.append(aco.find_shortest_route(PathSpecification(start, self.product_locations[i])))
-        return start_to_products
-
-    # Calculate optimal routes between the products and the end point
-    # @param maze Maze to calculate optimal routes in
-    # @return Optimal route from products to end
-    def build_products_to_end(self, aco):
-        end = self.spec.get_end()
-        products_to_end = []
-        for i in range(len(self.product_locations)):
-            products_to_end.append(aco.find_shortest_route(PathSpecification(self.product_locations[i], end)))
-        return products_to_end
-
-    # Load TSP data from a file
+    # Load TSP data from a file, either in the compact binary format or pickled.
+    # Binary files are memory mapped. Without routes only the distance arrays are read, they stay numpy arrays
+    # on the mapped file and the route attributes are None.
     # @param filePath Persist file
+    # @param load_routes Whether to unpack the routes and turn the distances into lists
     # @return TSPData object from the file
     @staticmethod
-    def read_from_file(file_path):
-        return pickle.load(open(file_path, "rb"))
+    def read_from_file(file_path, load_routes=True):
+        with open(file_path, "rb") as f:
+            magic = f.read(len(TSPData.MAGIC))
+        if magic != TSPData.MAGIC:
+            return pickle.load(open(file_path, "rb"))
+
+        data = np.memmap(file_path, dtype=np.uint8, mode="r")
+        position = len(TSPData.MAGIC)
+
+        # read the next section of the file
+        def section(dtype, count):
+            nonlocal position
+            array = np.frombuffer(data, dtype=dtype, count=count, offset=position)
+            position += array.nbytes + (-array.nbytes % 8)
+            return array
+
+        header = section(np.int64, 8)
+        if header[0] != TSPData.VERSION:
+            raise ValueError("Unsupported TSP data version " + str(header[0]) + " in " + file_path)
+        number_of_products = int(header[1])
+        locations = section(np.int32, 2 * number_of_products).reshape(number_of_products, 2).tolist()
+        spec = PathSpecification(Coordinate(int(header[2]), int(header[3])),
+                                 Coordinate(int(header[4]), int(header[5])))
+        tsp_data = TSPData([Coordinate(x, y) for x, y in locations], spec)
+        tsp_data.start_distances = section(np.int32, number_of_products)
+        tsp_data.distances = section(np.int32, number_of_products ** 2).reshape(number_of_products,
+                                                                                 number_of_products)
+        tsp_data.end_distances = section(np.int32, number_of_products)
+        if not load_routes:
+            return tsp_data
+
+        tsp_data.start_distances = tsp_data.start_distances.tolist()
+        tsp_data.distances = tsp_data.distances.tolist()
+        tsp_data.end_distances = tsp_data.end_distances.tolist()
+        if header[6] == 0:
+            return tsp_data
+        count = number_of_products ** 2 + 2 * number_of_products
+        offsets = section(np.int64, count + 1)
+        packed = section(np.uint8, -(-int(offsets[-1]) // 4))
+        starts = []
+        for location in tsp_data.product_locations:
+            starts.extend([location] * number_of_products)
+        starts.extend([spec.get_start()] * number_of_products)
+        starts.extend(tsp_data.product_locations)
+        routes = Route.unpack_routes(starts, offsets, packed)
+        tsp_data.product_to_product = [routes[i * number_of_products:(i + 1) * number_of_products]
+                                       for i in range(number_of_products)]
+        tsp_data.start_to_product = routes[number_of_products ** 2:number_of_products ** 2 + number_of_products]
+        tsp_data.product_to_end = routes[number_of_products ** 2 + number_of_products:]
+        return tsp_data
 
     # Read a TSP problem specification based on a coordinate file and a product file
     # @param coordinates Path to the coordinate file
@@ -201,10 +595,12 @@ if __name__ == "__main__":
     # construct optimization
     maze = Maze.create_maze("./../data/hard maze.txt")
     pd = TSPData.read_specification(coordinates, tsp_path)
+    maze = maze.prune_dead_ends(pd.get_locations())
     aco = AntColonyOptimization(maze, gen, no_gen, q, evap)
 
     # run optimization and write to file
-    pd.calculate_routes(aco)
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    pd.calculate_routes(aco, workers, symmetric=True)
     pd.write_to_file(persist_file)
 
     # read from file and print
@@ -0,0 +1,51 @@
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+from src.Coordinate import Coordinate
+from src.Maze import Maze
+from src.PathSpecification import PathSpecification
+from src.ShortestPath import ShortestPath
+from src.TSPData import TSPData
+
+
+# TSP data for a corridor of the given width, with the start and end at its two ends.
+# @param width the number of tiles of the corridor
+# @param products the x coordinates of the products
+# @return tuple of the maze and the TSP data
+def make_corridor(width, products):
+    maze = Maze(np.ones((width, 1), dtype=np.uint8), width, 1)
+    spec = PathSpecification(Coordinate(0, 0), Coordinate(width - 1, 0))
+    return maze, TSPData([Coordinate(x, 0) for x in products], spec)
+
+
+# Routes that were cut off by closing a tile are found again when the tile is opened again.
+def test_update_routes_close_then_reopen():
+    maze, tsp_data = make_corridor(7, [3])
+    solver = ShortestPath(maze)
+    tsp_data.calculate_routes(solver, symmetric=True)
+    assert tsp_data.get_end_distances() == [3]
+
+    closed = [Coordinate(5, 0)]
+    maze.apply_wall_diff(closed=closed)
+    assert tsp_data.update_routes(solver, closed=closed, symmetric=True) == [("end", 0)]
+    assert tsp_data.get_end_distances() == [0]
+
+    maze.apply_wall_diff(opened=closed)
+    assert tsp_data.update_routes(solver, opened=closed, symmetric=True) == [("end", 0)]
+    rebuilt = make_corridor(7, [3])[1]
+    rebuilt.calculate_routes(ShortestPath(maze), symmetric=True)
+    assert tsp_data.get_end_distances() == rebuilt.get_end_distances() == [3]
+
+
+# Routes that were not found start at the start of their key, also the ones solved in reverse, so they survive
+# writing and reading the binary file.
+def test_unreachable_routes_start_at_their_key(tmp_path):
+    maze, tsp_data = make_corridor(5, [1, 3])
+    maze.apply_wall_diff(closed=[Coordinate(2, 0)])
+    tsp_data.calculate_routes(ShortestPath(maze), symmetric=True)
+    for key in tsp_data.route_keys():
+        assert tsp_data.get_route(key).get_start() == tsp_data.get_route_start(key)
+    file_path = str(tmp_path / "tsp.bin")
+    tsp_data.write_to_file(file_path)
+    assert tsp_data == TSPData.read_from_file(file_path)